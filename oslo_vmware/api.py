@@ -23,6 +23,7 @@ in case of connection problems or server API call overload.
 
 import logging
 
+from eventlet import greenthread
 from oslo_concurrency import lockutils
 from oslo_context import context
 from oslo_utils import excutils
@@ -85,41 +86,41 @@ class RetryDecorator(object):
     def __call__(self, f):
         func_name = reflection.get_callable_name(f)
 
-        def _func(*args, **kwargs):
-            result = None
-            try:
-                if self._retry_count:
-                    LOG.debug("Invoking %(func_name)s; retry count is "
-                              "%(retry_count)d.",
-                              {'func_name': func_name,
-                               'retry_count': self._retry_count})
-                result = f(*args, **kwargs)
-            except self._exceptions:
-                with excutils.save_and_reraise_exception() as ctxt:
-                    LOG.warning("Exception which is in the suggested list "
-                                "of exceptions occurred while invoking "
-                                "function: %s.",
-                                func_name,
-                                exc_info=True)
-                    if (self._max_retry_count != -1 and
-                            self._retry_count >= self._max_retry_count):
-                        LOG.error("Cannot retry upon suggested exception "
-                                  "since retry count (%(retry_count)d) "
-                                  "reached max retry count "
-                                  "(%(max_retry_count)d).",
-                                  {'retry_count': self._retry_count,
-                                   'max_retry_count': self._max_retry_count})
-                    else:
-                        ctxt.reraise = False
-                        self._retry_count += 1
-                        self._sleep_time += self._inc_sleep_time
-                        return self._sleep_time
-            raise loopingcall.LoopingCallDone(result)
-
         def func(*args, **kwargs):
-            loop = loopingcall.DynamicLoopingCall(_func, *args, **kwargs)
-            evt = loop.start(periodic_interval_max=self._max_sleep_time)
-            return evt.wait()
+            while True:
+                try:
+                    if self._retry_count:
+                        LOG.debug("Invoking %(func_name)s; retry count is "
+                                  "%(retry_count)d.",
+                                  {'func_name': func_name,
+                                   'retry_count': self._retry_count})
+                    return f(*args, **kwargs)
+                except self._exceptions:
+                    with excutils.save_and_reraise_exception() as ctxt:
+                        LOG.warning("Exception which is in the suggested "
+                                    "list of exceptions occurred while "
+                                    "invoking function: %s.",
+                                    func_name,
+                                    exc_info=True)
+                        if (self._max_retry_count != -1 and
+                                self._retry_count >= self._max_retry_count):
+                            LOG.error("Cannot retry upon suggested exception "
+                                      "since retry count (%(retry_count)d) "
+                                      "reached max retry count "
+                                      "(%(max_retry_count)d).",
+                                      {'retry_count': self._retry_count,
+                                       'max_retry_count':
+                                           self._max_retry_count})
+                        else:
+                            ctxt.reraise = False
+                            self._retry_count += 1
+                            self._sleep_time += self._inc_sleep_time
+                # The retry loop runs in the caller's greenthread, so there
+                # is no need to spawn a looping call for every invocation.
+                sleep_time = min(self._sleep_time, self._max_sleep_time)
+                LOG.debug("Sleeping for %.02f seconds before retrying "
+                          "%s.", sleep_time, func_name)
+                greenthread.sleep(sleep_time)
 
         return func
 
@@ -139,7 +140,8 @@ class VMwareAPISession(object):
                  api_retry_count, task_poll_interval, scheme='https',
                  create_session=True, wsdl_loc=None, pbm_wsdl_loc=None,
                  port=443, cacert=None, insecure=True, pool_size=10,
-                 connection_timeout=None, op_id_prefix='oslo.vmware'):
+                 connection_timeout=None, op_id_prefix='oslo.vmware',
+                 pool_connections=None):
         """Initializes the API session with given parameters.
 
         :param host: ESX/VC server IP address or host name
@@ -164,6 +166,8 @@ class VMwareAPISession(object):
         :param connection_timeout: Maximum time in seconds to wait for peer to
                                    respond.
         :param op_id_prefix: String prefix for the operation ID.
+        :param pool_connections: Number of per-host connection pools to
+                                 cache; defaults to pool_size
         :raises: VimException, VimFaultException, VimAttributeException,
                  VimSessionOverLoadException
         """
@@ -185,6 +189,7 @@ class VMwareAPISession(object):
         self._pool_size = pool_size
         self._connection_timeout = connection_timeout
         self._op_id_prefix = op_id_prefix
+        self._pool_connections = pool_connections
         if create_session:
             self._create_session()
 
@@ -204,7 +209,8 @@ class VMwareAPISession(object):
                                 insecure=self._insecure,
                                 pool_maxsize=self._pool_size,
                                 connection_timeout=self._connection_timeout,
-                                op_id_prefix=self._op_id_prefix)
+                                op_id_prefix=self._op_id_prefix,
+                                pool_connections=self._pool_connections)
         return self._vim
 
     @property
@@ -218,7 +224,8 @@ class VMwareAPISession(object):
                                 insecure=self._insecure,
                                 pool_maxsize=self._pool_size,
                                 connection_timeout=self._connection_timeout,
-                                op_id_prefix=self._op_id_prefix)
+                                op_id_prefix=self._op_id_prefix,
+                                pool_connections=self._pool_connections)
             if self._session_id:
                 # To handle the case where pbm property is accessed after
                 # session creation. If pbm property is accessed before session
@@ -18,6 +18,7 @@ Functions and classes for image transfer between ESX/VC & image service.
 """
 
 import logging
+import shutil
 import tarfile
 
 from eventlet import timeout
@@ -36,7 +37,7 @@ from oslo_vmware import vim_util
 LOG = logging.getLogger(__name__)
 
 NFC_LEASE_UPDATE_PERIOD = 60  # update NFC lease every 60sec.
-CHUNK_SIZE = 64 * units.Ki  # default chunk size for image transfer
+CHUNK_SIZE = units.Mi  # default chunk size for image transfer
 
 
 def _create_progress_updater(handle):
@@ -46,7 +47,10 @@ def _create_progress_updater(handle):
         return updater
 
 
-def _start_transfer(read_handle, write_handle, timeout_secs):
+def _start_transfer(read_handle, write_handle, timeout_secs,
+                    chunk_size=None):
+    if chunk_size is None:
+        chunk_size = CHUNK_SIZE
     # read_handle/write_handle could be an NFC lease, so we need to
     # periodically update its progress
     read_updater = _create_progress_updater(read_handle)
@@ -54,11 +58,7 @@ def _start_transfer(read_handle, write_handle, timeout_secs):
 
     timer = timeout.Timeout(timeout_secs)
     try:
-        while True:
-            data = read_handle.read(CHUNK_SIZE)
-            if not data:
-                break
-            write_handle.write(data)
+        shutil.copyfileobj(read_handle, write_handle, chunk_size)
     except timeout.Timeout as excep:
         msg = (_('Timeout, read_handle: "%(src)s", write_handle: "%(dest)s"') %
                {'src': read_handle,
@@ -116,13 +116,15 @@ def download_image(image, image_meta, session, datastore, rel_path,
 
 
 def download_flat_image(context, timeout_secs, image_service, image_id,
-                        **kwargs):
+                        chunk_size=None, **kwargs):
     """Download flat image from the image service to VMware server.
 
     :param context: image service write context
     :param timeout_secs: time in seconds to wait for the download to complete
     :param image_service: image service handle
     :param image_id: ID of the image to be downloaded
+    :param chunk_size: size in bytes of the chunks copied to the destination;
+                       defaults to CHUNK_SIZE
     :param kwargs: keyword arguments to configure the destination
                    file write handle
     :raises: VimConnectionException, ImageTransferException, ValueError
@@ -142,14 +144,15 @@ def download_flat_image(context, timeout_secs, image_service, image_id,
                                               kwargs.get('file_path'),
                                               file_size,
                                               cacerts=kwargs.get('cacerts'))
-    _start_transfer(read_handle, write_handle, timeout_secs)
+    _start_transfer(read_handle, write_handle, timeout_secs,
+                    chunk_size=chunk_size)
     LOG.debug("Downloaded image: %s from image service as a flat file.",
               image_id)
 
 
 def download_file(
         read_handle, host, port, dc_name, ds_name, cookies,
-        upload_file_path, file_size, cacerts, timeout_secs):
+        upload_file_path, file_size, cacerts, timeout_secs, chunk_size=None):
     """Download file to VMware server.
 
     :param read_handle: file read handle
@@ -165,6 +168,8 @@ def download_file(
     :param cacerts: CA bundle file to use for SSL verification
     :param timeout_secs: timeout in seconds to wait for the download to
                          complete
+    :param chunk_size: size in bytes of the chunks copied to the destination;
+                       defaults to CHUNK_SIZE
     """
     write_handle = rw_handles.FileWriteHandle(host,
                                               port,
@@ -174,16 +179,19 @@ def download_file(
                                               upload_file_path,
                                               file_size,
                                               cacerts=cacerts)
-    _start_transfer(read_handle, write_handle, timeout_secs)
+    _start_transfer(read_handle, write_handle, timeout_secs,
+                    chunk_size=chunk_size)
 
 
 def download_stream_optimized_data(context, timeout_secs, read_handle,
-                                   **kwargs):
+                                   chunk_size=None, **kwargs):
     """Download stream optimized data to VMware server.
 
     :param context: image service write context
     :param timeout_secs: time in seconds to wait for the download to complete
     :param read_handle: handle from which to read the image data
+    :param chunk_size: size in bytes of the chunks copied to the destination;
+                       defaults to CHUNK_SIZE
     :param kwargs: keyword arguments to configure the destination
                    VMDK write handle
     :returns: managed object reference of the VM created for import to VMware
@@ -201,7 +209,8 @@ def download_stream_optimized_data(context, timeout_secs, read_handle,
                                               kwargs.get('vm_import_spec'),
                                               file_size,
                                               kwargs.get('http_method', 'PUT'))
-    _start_transfer(read_handle, write_handle, timeout_secs)
+    _start_transfer(read_handle, write_handle, timeout_secs,
+                    chunk_size=chunk_size)
     return write_handle.get_imported_vm()
 
 
@@ -219,13 +228,16 @@ def _get_vmdk_handle(ova_handle):
 
 
 def download_stream_optimized_image(context, timeout_secs, image_service,
-                                    image_id, **kwargs):
+                                    image_id, container_format=None,
+                                    **kwargs):
     """Download stream optimized image from image service to VMware server.
 
     :param context: image service write context
     :param timeout_secs: time in seconds to wait for the download to complete
     :param image_service: image service handle
     :param image_id: ID of the image to be downloaded
+    :param container_format: container format of the image; if not
+                             specified, it is read from the image metadata
     :param kwargs: keyword arguments to configure the destination
                    VMDK write handle
     :returns: managed object reference of the VM created for import to VMware
@@ -234,8 +246,9 @@ def download_stream_optimized_image(context, timeout_secs, image_service,
              VimSessionOverLoadException, VimConnectionException,
              ImageTransferException, ValueError
     """
-    metadata = image_service.show(context, image_id)
-    container_format = metadata.get('container_format')
+    if container_format is None:
+        metadata = image_service.show(context, image_id)
+        container_format = metadata.get('container_format')
 
     LOG.debug("Downloading image: %(id)s (container: %(container)s) from image"
               " service as a stream optimized file.",
@@ -262,12 +275,14 @@ def download_stream_optimized_image(context, timeout_secs, image_service,
 
 
 def copy_stream_optimized_disk(
-        context, timeout_secs, write_handle, **kwargs):
+        context, timeout_secs, write_handle, chunk_size=None, **kwargs):
     """Copy virtual disk from VMware server to the given write handle.
 
     :param context: context
     :param timeout_secs: time in seconds to wait for the copy to complete
     :param write_handle: copy destination
+    :param chunk_size: size in bytes of the chunks copied to the destination;
+                       defaults to CHUNK_SIZE
     :param kwargs: keyword arguments to configure the source
                    VMDK read handle
     :raises: VimException, VimFaultException, VimAttributeException,
@@ -289,7 +304,8 @@ def copy_stream_optimized_disk(
     updater = loopingcall.FixedIntervalLoopingCall(read_handle.update_progress)
     try:
         updater.start(interval=NFC_LEASE_UPDATE_PERIOD)
-        _start_transfer(read_handle, write_handle, timeout_secs)
+        _start_transfer(read_handle, write_handle, timeout_secs,
+                        chunk_size=chunk_size)
     finally:
         updater.stop()
     LOG.debug("Downloaded virtual disk: %s.", vmdk_file_path)
@@ -20,6 +20,7 @@ PBM is used for policy based placement in VMware datastores.
 Refer http://goo.gl/GR2o6U for more details.
 """
 
+import functools
 import logging
 import os
 
@@ -40,7 +41,8 @@ class Pbm(service.Service):
 
     def __init__(self, protocol='https', host='localhost', port=443,
                  wsdl_url=None, cacert=None, insecure=True, pool_maxsize=10,
-                 connection_timeout=None, op_id_prefix='oslo.vmware'):
+                 connection_timeout=None, op_id_prefix='oslo.vmware',
+                 pool_connections=None):
         """Constructs a PBM service client object.
 
         :param protocol: http or https
@@ -56,12 +58,15 @@ class Pbm(service.Service):
         :param op_id_prefix: String prefix for the operation ID.
         :param connection_timeout: Maximum time in seconds to wait for peer to
                                    respond.
+        :param pool_connections: Number of per-host connection pools to
+                                 cache; defaults to pool_maxsize
         """
         base_url = service.Service.build_base_url(protocol, host, port)
         soap_url = base_url + '/pbm'
         super(Pbm, self).__init__(wsdl_url, soap_url, cacert, insecure,
                                   pool_maxsize, connection_timeout,
-                                  op_id_prefix)
+                                  op_id_prefix,
+                                  pool_connections=pool_connections)
 
     def set_soap_cookie(self, cookie):
         """Set the specified vCenter session cookie in the SOAP header
@@ -158,10 +163,12 @@ def convert_datastores_to_hubs(pbm_client_factory, datastores):
     :param datastores: list of datastore morefs
     :returns: list of PbmPlacementHub morefs
     """
+    create = pbm_client_factory.create
+    get_moref_value = vim_util.get_moref_value
     hubs = []
     for ds in datastores:
-        hub = pbm_client_factory.create('ns0:PbmPlacementHub')
-        hub.hubId = vim_util.get_moref_value(ds)
+        hub = create('ns0:PbmPlacementHub')
+        hub.hubId = get_moref_value(ds)
         hub.hubType = 'Datastore'
         hubs.append(hub)
     return hubs
@@ -174,14 +181,12 @@ def filter_datastores_by_hubs(hubs, datastores):
     :param datastores: all candidate datastores
     :returns: subset of datastores corresponding to the given hub list
     """
-    filtered_dss = []
-    hub_ids = [hub.hubId for hub in hubs]
-    for ds in datastores:
-        if vim_util.get_moref_value(ds) in hub_ids:
-            filtered_dss.append(ds)
-    return filtered_dss
+    hub_ids = {hub.hubId for hub in hubs}
+    return [ds for ds in datastores
+            if vim_util.get_moref_value(ds) in hub_ids]
 
 
+@functools.lru_cache(maxsize=16)
 def get_pbm_wsdl_location(vc_version):
     """Return PBM WSDL file location corresponding to VC version.
 
@@ -27,6 +27,7 @@ import time
 
 from oslo_utils import excutils
 from oslo_utils import netutils
+from oslo_utils import units
 import requests
 import urllib.parse as urlparse
 from urllib3 import connection as httplib
@@ -40,7 +41,7 @@ LOG = logging.getLogger(__name__)
 
 MIN_PROGRESS_DIFF_TO_LOG = 25
 MIN_UPDATE_INTERVAL = 60
-READ_CHUNKSIZE = 65536
+READ_CHUNKSIZE = units.Mi
 USER_AGENT = 'OpenStack-ESX-Adapter'
 
 
@@ -646,7 +647,7 @@ class VmdkWriteHandle(VmdkHandle):
         LOG.debug("Closed VMDK write handle for %s.", self._url)
 
     def _get_progress(self):
-        return float(self._bytes_written) / self._vmdk_size * 100
+        return self._bytes_written * 100 // self._vmdk_size
 
     def __str__(self):
         return "VMDK write handle for %s" % self._url
@@ -735,7 +736,7 @@ class VmdkReadHandle(VmdkHandle):
         LOG.debug("Closed VMDK read handle for %s.", self._url)
 
     def _get_progress(self):
-        return float(self._bytes_read) / self._vmdk_size * 100
+        return self._bytes_read * 100 // self._vmdk_size
 
     def __str__(self):
         return "VMDK read handle for %s" % self._url
@@ -747,10 +748,13 @@ class ImageReadHandle(object):
     def __init__(self, glance_read_iter):
         """Initializes the read handle with given parameters.
 
+        iter() is called on glance_read_iter here; read() and get_next()
+        share the resulting iterator.
+
         :param glance_read_iter: iterator to read data from glance image
         """
         self._glance_read_iter = glance_read_iter
-        self._iter = self.get_next()
+        self._iter = iter(glance_read_iter)
 
     def read(self, chunk_size):
         """Read an item from the image data iterator.
@@ -767,8 +771,7 @@ class ImageReadHandle(object):
 
     def get_next(self):
         """Get the next item from the image iterator."""
-        for data in self._glance_read_iter:
-            yield data
+        yield from self._iter
 
     def close(self):
         """Close the read handle.
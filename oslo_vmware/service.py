@@ -19,9 +19,9 @@ Common classes that provide access to vSphere services.
 
 import http.client as httplib
 import io
+import itertools
 import logging
 
-import netaddr
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
 import requests
@@ -40,17 +40,45 @@ CACHE_TIMEOUT = 60 * 60  # One hour cache timeout
 ADDRESS_IN_USE_ERROR = 'Address already in use'
 CONN_ABORT_ERROR = 'Software caused connection abort'
 RESP_NOT_XML_ERROR = 'Response is "text/html", not "text/xml"'
+# Socket errors which might be caused by server API call overload.
+_SOCKET_OVERLOAD_ERRORS = (ADDRESS_IN_USE_ERROR, CONN_ABORT_ERROR)
 
 SERVICE_INSTANCE = 'ServiceInstance'
+SOAP_SESSION_COOKIE = 'vmware_soap_session'
 
 LOG = logging.getLogger(__name__)
 
 
+def _set_string_type(node):
+    node.set('xsi:type', 'xsd:string')
+
+
+def _set_remove_key_type(node):
+    # removeKey may be a 'int' or a 'string'
+    text = node.text
+    if text:
+        text = text.strip()
+        if text[:1] in ('+', '-'):
+            text = text[1:]
+    if text and text.isdecimal():
+        node.set('xsi:type', 'xsd:int')
+    else:
+        node.set('xsi:type', 'xsd:string')
+
+
+# Handlers setting the xsi:type attribute of AnyType nodes, keyed by node name.
+_TYPE_ATTRIBUTE_HANDLERS = {
+    'value': _set_string_type,
+    'val': _set_string_type,
+    'removeKey': _set_remove_key_type,
+}
+
+
 class ServiceMessagePlugin(plugin.MessagePlugin):
     """Suds plug-in handling some special cases while calling VI SDK."""
 
-    # list of XML elements which are allowed to be empty
-    EMPTY_ELEMENTS = ["VirtualMachineEmptyProfileSpec"]
+    # set of XML elements which are allowed to be empty
+    EMPTY_ELEMENTS = frozenset(["VirtualMachineEmptyProfileSpec"])
 
     def add_attribute_for_value(self, node):
         """Helper to handle AnyType.
@@ -60,24 +88,32 @@ class ServiceMessagePlugin(plugin.MessagePlugin):
 
         :param node: XML value node
         """
-        if node.name == 'value' or node.name == 'val':
-            node.set('xsi:type', 'xsd:string')
-        # removeKey may be a 'int' or a 'string'
-        if node.name == 'removeKey':
-            try:
-                int(node.text)
-                node.set('xsi:type', 'xsd:int')
-            except (ValueError, TypeError):
-                node.set('xsi:type', 'xsd:string')
+        handler = _TYPE_ATTRIBUTE_HANDLERS.get(node.name)
+        if handler is not None:
+            handler(node)
 
     def prune(self, el):
-        pruned = []
+        """Prunes empty descendants of the given node.
+
+        The AnyType attribute is set on every descendant which is kept, so
+        that the tree is traversed only once per request.
+
+        :param el: XML node
+        """
+        prune = self.prune
+        add_attribute_for_value = self.add_attribute_for_value
+        empty_elements = self.EMPTY_ELEMENTS
+        kept = []
         for c in el.children:
-            self.prune(c)
-            if c.isempty(False) and c.name not in self.EMPTY_ELEMENTS:
-                pruned.append(c)
-        for p in pruned:
-            el.children.remove(p)
+            if c.children:
+                prune(c)
+            # The emptiness check takes attributes into account, hence it
+            # has to be done before setting the type attribute.
+            if c.isempty(False) and c.name not in empty_elements:
+                continue
+            add_attribute_for_value(c)
+            kept.append(c)
+        el.children = kept
 
     def marshalled(self, context):
         """Modifies the envelope document before it is sent.
@@ -92,7 +128,7 @@ class ServiceMessagePlugin(plugin.MessagePlugin):
         # without values; e.g., <test/> as opposed to <test>test</test>.
 
         self.prune(context.envelope)
-        context.envelope.walk(self.add_attribute_for_value)
+        self.add_attribute_for_value(context.envelope)
 
 
 class Response(io.BytesIO):
@@ -113,7 +149,9 @@ class Response(io.BytesIO):
     def msg(self):
         return self
 
-    def read(self, chunk_size, **kwargs):
+    def read(self, chunk_size=-1, **kwargs):
+        if chunk_size is None:
+            chunk_size = -1
         return io.BytesIO.read(self, chunk_size)
 
     def info(self):
@@ -144,9 +182,7 @@ class LocalFileAdapter(requests.adapters.HTTPAdapter):
     def _build_response_from_file(self, request):
         file_path = request.url[7:]
         with open(file_path, 'rb') as f:
-            file_content = f.read()
-            buff = bytearray(file_content.decode(), "utf-8")
-            resp = Response(buff)
+            resp = Response(f.read())
             return self.build_response(request, resp)
 
     def send(self, request, stream=False, timeout=None,
@@ -157,16 +193,20 @@ class LocalFileAdapter(requests.adapters.HTTPAdapter):
 
 class RequestsTransport(transport.Transport):
     def __init__(self, cacert=None, insecure=True, pool_maxsize=10,
-                 connection_timeout=None):
+                 connection_timeout=None, pool_connections=None):
         transport.Transport.__init__(self)
         # insecure flag is used only if cacert is not
         # specified.
         self.verify = cacert if cacert else not insecure
+        if pool_connections is None:
+            pool_connections = pool_maxsize
         self.session = requests.Session()
         self.session.mount('file:///',
                            LocalFileAdapter(pool_maxsize=pool_maxsize))
-        self.session.mount('https://', requests.adapters.HTTPAdapter(
-            pool_connections=pool_maxsize, pool_maxsize=pool_maxsize))
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.cookiejar = self.session.cookies
         self._connection_timeout = connection_timeout
 
@@ -189,19 +229,29 @@ class MemoryCache(cache.ObjectCache):
 
     def get(self, key):
         """Retrieves the value for a key or None."""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        (timeout, value) = entry
+        if timeout and timeutils.utcnow_ts() >= timeout:
+            self._cache.pop(key, None)
+            return None
+        return value
+
+    def put(self, key, value, time=CACHE_TIMEOUT):
+        """Sets the value for a key."""
+        # Expired entries are purged here rather than on every lookup;
+        # all the WSDL and schema documents are looked up whenever a suds
+        # client is created, whereas puts happen only on cache misses.
         now = timeutils.utcnow_ts()
         for k in list(self._cache):
             (timeout, _value) = self._cache[k]
             if timeout and now >= timeout:
                 del self._cache[k]
 
-        return self._cache.get(key, (0, None))[1]
-
-    def put(self, key, value, time=CACHE_TIMEOUT):
-        """Sets the value for a key."""
         timeout = 0
         if time != 0:
-            timeout = timeutils.utcnow_ts() + time
+            timeout = now + time
         self._cache[key] = (timeout, value)
         return True
 
@@ -235,16 +285,43 @@ class Service(object):
 
     def __init__(self, wsdl_url=None, soap_url=None,
                  cacert=None, insecure=True, pool_maxsize=10,
-                 connection_timeout=None, op_id_prefix='oslo.vmware'):
+                 connection_timeout=None, op_id_prefix='oslo.vmware',
+                 pool_connections=None):
+        """Constructs a service client object.
+
+        :param wsdl_url: WSDL url
+        :param soap_url: SOAP endpoint url
+        :param cacert: Specify a CA bundle file to use in verifying a
+                       TLS (https) server certificate.
+        :param insecure: Verify HTTPS connections using system certificates,
+                         used only if cacert is not specified
+        :param pool_maxsize: Maximum number of connections kept in the http
+                             connection pool of a host; it should be at least
+                             the number of threads invoking APIs concurrently,
+                             otherwise connections are discarded and
+                             re-established
+        :param connection_timeout: Maximum time in seconds to wait for peer to
+                                   respond.
+        :param op_id_prefix: String prefix for the operation ID.
+        :param pool_connections: Number of per-host connection pools to
+                                 cache; defaults to pool_maxsize
+        """
         self.wsdl_url = wsdl_url
         self.soap_url = soap_url
         self.op_id_prefix = op_id_prefix
+        # Operation IDs are made of a random part generated once per client
+        # and a counter, which keeps them unique without generating a UUID
+        # for every call.
+        self._op_id_base = '%s-%s-' % (
+            op_id_prefix, uuidutils.generate_uuid(dashed=False)[:12])
+        self._op_id_counter = itertools.count()
         LOG.debug("Creating suds client with soap_url='%s' and wsdl_url='%s'",
                   self.soap_url, self.wsdl_url)
         transport = RequestsTransport(cacert=cacert,
                                       insecure=insecure,
                                       pool_maxsize=pool_maxsize,
-                                      connection_timeout=connection_timeout)
+                                      connection_timeout=connection_timeout,
+                                      pool_connections=pool_connections)
         self.client = CompatibilitySudsClient(self.wsdl_url,
                                               transport=transport,
                                               location=self.soap_url,
@@ -252,13 +329,21 @@ class Service(object):
                                               cache=_CACHE)
         self._service_content = None
         self._vc_session_cookie = None
+        self._soap_headers_state = None
+        # suds copies the header elements into each request, hence they
+        # can be reused across calls.
+        self._vc_session_cookie_elem = None
+        self._op_id_elem = element.Element('operationID')
 
     @staticmethod
     def build_base_url(protocol, host, port):
-        proto_str = '%s://' % protocol
-        host_str = '[%s]' % host if netaddr.valid_ipv6(host) else host
-        port_str = '' if port is None else ':%d' % port
-        return proto_str + host_str + port_str
+        # Only IPv6 addresses contain colons; they need to be enclosed in
+        # brackets unless that is already done.
+        if ':' in host and not host.startswith('['):
+            host = '[%s]' % host
+        if port is None:
+            return '%s://%s' % (protocol, host)
+        return '%s://%s:%d' % (protocol, host, port)
 
     @staticmethod
     def _retrieve_properties_ex_fault_checker(response):
@@ -287,15 +372,14 @@ class Service(object):
             fault_list = [exceptions.NOT_AUTHENTICATED]
         else:
             for obj_cont in response.objects:
-                if hasattr(obj_cont, 'missingSet'):
-                    for missing_elem in obj_cont.missingSet:
-                        f_type = missing_elem.fault.fault
-                        f_name = f_type.__class__.__name__
-                        fault_list.append(f_name)
-                        if f_name == exceptions.NO_PERMISSION:
-                            details['object'] = \
-                                vim_util.get_moref_value(f_type.object)
-                            details['privilegeId'] = f_type.privilegeId
+                for missing_elem in getattr(obj_cont, 'missingSet', ()):
+                    f_type = missing_elem.fault.fault
+                    f_name = f_type.__class__.__name__
+                    fault_list.append(f_name)
+                    if f_name == exceptions.NO_PERMISSION:
+                        details['object'] = \
+                            vim_util.get_moref_value(f_type.object)
+                        details['privilegeId'] = f_type.privilegeId
 
         if fault_list:
             fault_string = _("Error occurred while calling "
@@ -312,16 +396,24 @@ class Service(object):
         messages across different systems (OpenStack, vCenter, ESX).
         vcSessionCookie is needed when making PBM calls.
         """
+        headers_state = (self.client, self._vc_session_cookie, op_id)
+        if op_id is None and headers_state == self._soap_headers_state:
+            # Same client and headers as the ones of the previous call.
+            return
         headers = []
         if self._vc_session_cookie:
-            elem = element.Element('vcSessionCookie').setText(
-                self._vc_session_cookie)
+            elem = self._vc_session_cookie_elem
+            if elem is None or elem.getText() != self._vc_session_cookie:
+                elem = element.Element('vcSessionCookie').setText(
+                    self._vc_session_cookie)
+                self._vc_session_cookie_elem = elem
             headers.append(elem)
         if op_id:
-            elem = element.Element('operationID').setText(op_id)
-            headers.append(elem)
-        if headers:
-            self.client.set_options(soapheaders=headers)
+            headers.append(self._op_id_elem.setText(op_id))
+        # Headers are set even if empty so that the operation ID of the
+        # previous call is not sent again.
+        self.client.set_options(soapheaders=headers)
+        self._soap_headers_state = headers_state
 
     @property
     def service_content(self):
@@ -331,9 +423,11 @@ class Service(object):
 
     def get_http_cookie(self):
         """Return the vCenter session cookie."""
-        cookies = self.client.cookiejar
-        for cookie in cookies:
-            if cookie.name.lower() == 'vmware_soap_session':
+        # The jar holds only a few cookies and the server may replace the
+        # session cookie at any time, hence it is not cached. The name is
+        # compared case-insensitively, which RequestsCookieJar.get() cannot.
+        for cookie in self.client.cookiejar:
+            if cookie.name.lower() == SOAP_SESSION_COOKIE:
                 return cookie.value
 
     def __getattr__(self, attr_name):
@@ -366,12 +460,13 @@ class Service(object):
                 if not skip_op_id:
                     # Generate opID. It will appear in vCenter and ESX logs for
                     # this particular remote call.
-                    op_id = '%s-%s' % (self.op_id_prefix,
-                                       uuidutils.generate_uuid())
-                    LOG.debug('Invoking %s.%s with opID=%s',
-                              vim_util.get_moref_type(managed_object),
-                              attr_name,
-                              op_id)
+                    op_id = self._op_id_base + format(
+                        next(self._op_id_counter), 'x')
+                    if LOG.isEnabledFor(logging.DEBUG):
+                        LOG.debug('Invoking %s.%s with opID=%s',
+                                  vim_util.get_moref_type(managed_object),
+                                  attr_name,
+                                  op_id)
                 self._set_soap_headers(op_id)
                 request = getattr(self.client.service, attr_name)
                 response = request(managed_object, **kwargs)
@@ -433,13 +528,13 @@ class Service(object):
 
                 # Socket errors which need special handling; some of these
                 # might be caused by server API call overload.
-                if (str(excep).find(ADDRESS_IN_USE_ERROR) != -1 or
-                        str(excep).find(CONN_ABORT_ERROR)) != -1:
+                excep_msg = str(excep)
+                if any(err in excep_msg for err in _SOCKET_OVERLOAD_ERRORS):
                     raise exceptions.VimSessionOverLoadException(
                         _("Socket error in %s.") % attr_name, excep)
                 # Type error which needs special handling; it might be caused
                 # by server API call overload.
-                elif str(excep).find(RESP_NOT_XML_ERROR) != -1:
+                elif RESP_NOT_XML_ERROR in excep_msg:
                     raise exceptions.VimSessionOverLoadException(
                         _("Type error in %s.") % attr_name, excep)
                 else:
@@ -468,10 +563,12 @@ class SudsLogFilter(logging.Filter):
         if login is None:
             return True
 
-        if login.childAtPath('userName') is not None:
-            login.childAtPath('userName').setText('***')
-        if login.childAtPath('password') is not None:  # nosec
-            login.childAtPath('password').setText('***')  # nosec
+        user_name = login.childAtPath('userName')
+        if user_name is not None:
+            user_name.setText('***')
+        password = login.childAtPath('password')  # nosec
+        if password is not None:
+            password.setText('***')  # nosec
 
         session_id = login.childAtPath('sessionID')
         if session_id is not None:
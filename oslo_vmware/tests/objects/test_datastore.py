@@ -12,8 +12,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import http.client as httplib
+import types
 from unittest import mock
 
+import ddt
 from oslo_utils import units
 import urllib.parse as urlparse
 
@@ -23,21 +27,35 @@ from oslo_vmware.tests import base
 from oslo_vmware import vim_util
 
 
-class HostMount(object):
+_DS_REF = vim_util.get_moref('ds-0', 'Datastore')
 
-    def __init__(self, key, mountInfo):
-        self.key = key
-        self.mountInfo = mountInfo
+HostMount = collections.namedtuple('HostMount', ['key', 'mountInfo'])
 
+MountInfo = collections.namedtuple('MountInfo',
+                                   ['accessMode', 'mounted', 'accessible'])
 
-class MountInfo(object):
 
-    def __init__(self, accessMode, mounted, accessible):
-        self.accessMode = accessMode
-        self.mounted = mounted
-        self.accessible = accessible
+def _create_session(**invoke_api_kwargs):
+    """Returns a fake session exposing only vim and invoke_api."""
+    # invoke_api is only called, hence it does not need child mocks.
+    invoke_api = mock.Mock(spec=['__call__'], **invoke_api_kwargs)
+    return types.SimpleNamespace(vim=mock.Mock(), invoke_api=invoke_api)
 
 
+def _create_host_mounts(*host_mounts):
+    """Returns the result of reading the host property of a datastore."""
+    return types.SimpleNamespace(DatastoreHostMount=list(host_mounts))
+
+
+def _create_host_runtimes(host, in_maintenance_mode):
+    """Returns the result of reading the runtime property of a host."""
+    runtime = types.SimpleNamespace(inMaintenanceMode=in_maintenance_mode)
+    prop = types.SimpleNamespace(name='runtime', val=runtime)
+    obj = types.SimpleNamespace(obj=host, propSet=[prop])
+    return types.SimpleNamespace(objects=[obj])
+
+
+@ddt.ddt
 class DatastoreTestCase(base.TestCase):
 
     """Test the Datastore object."""
@@ -83,12 +101,9 @@ class DatastoreTestCase(base.TestCase):
         self.assertEqual(ds_url.path, path)
 
     def test_get_summary(self):
-        ds_ref = vim_util.get_moref('ds-0', 'Datastore')
-        ds = datastore.Datastore(ds_ref, 'ds-name')
-        summary = mock.sentinel.summary
-        session = mock.Mock()
-        session.invoke_api = mock.Mock()
-        session.invoke_api.return_value = summary
+        ds = datastore.Datastore(_DS_REF, 'ds-name')
+        summary = object()
+        session = _create_session(return_value=summary)
         ret = ds.get_summary(session)
         self.assertEqual(summary, ret)
         session.invoke_api.assert_called_once_with(vim_util,
@@ -98,9 +113,8 @@ class DatastoreTestCase(base.TestCase):
 
     def _test_get_connected_hosts(self, in_maintenance_mode,
                                   m1_accessible=True):
-        session = mock.Mock()
-        ds_ref = vim_util.get_moref('ds-0', 'Datastore')
-        ds = datastore.Datastore(ds_ref, 'ds-name')
+        session = _create_session()
+        ds = datastore.Datastore(_DS_REF, 'ds-name')
         ds.get_summary = mock.Mock()
         ds.get_summary.return_value.accessible = False
         self.assertEqual([], ds.get_connected_hosts(session))
@@ -111,33 +125,20 @@ class DatastoreTestCase(base.TestCase):
         m4 = HostMount("m4", MountInfo('readWrite', True, False))
         ds.get_summary.assert_called_once_with(session)
 
-        class Prop(object):
-            DatastoreHostMount = [m1, m2, m3, m4]
-
-        class HostRuntime(object):
-            inMaintenanceMode = in_maintenance_mode
-
-        class HostProp(object):
-            name = 'runtime'
-            val = HostRuntime()
-
-        class Object(object):
-            obj = "m1"
-            propSet = [HostProp()]
-
-        class Runtime(object):
-            objects = [Object()]
-
-        session.invoke_api = mock.Mock(side_effect=[Prop(), Runtime()])
+        session.invoke_api.side_effect = [
+            _create_host_mounts(m1, m2, m3, m4),
+            _create_host_runtimes("m1", in_maintenance_mode)]
         hosts = ds.get_connected_hosts(session)
-        calls = [mock.call(vim_util, 'get_object_property',
-                           session.vim, ds_ref, 'host')]
+        # The host mounts are read first and the runtimes of the usable
+        # hosts, if any, are read last.
+        session.invoke_api.assert_any_call(vim_util, 'get_object_property',
+                                           session.vim, _DS_REF, 'host')
         if m1_accessible:
-            calls.append(
-                mock.call(vim_util,
-                          'get_properties_for_a_collection_of_objects',
-                          session.vim, 'HostSystem', ["m1"], ['runtime']))
-        self.assertEqual(calls, session.invoke_api.mock_calls)
+            session.invoke_api.assert_called_with(
+                vim_util, 'get_properties_for_a_collection_of_objects',
+                session.vim, 'HostSystem', ["m1"], ['runtime'])
+        self.assertEqual(2 if m1_accessible else 1,
+                         session.invoke_api.call_count)
         return hosts
 
     def test_get_connected_hosts(self):
@@ -153,29 +154,24 @@ class DatastoreTestCase(base.TestCase):
         hosts = self._test_get_connected_hosts(False, False)
         self.assertEqual(0, len(hosts))
 
-    def test_is_datastore_mount_usable(self):
-        m = MountInfo('readWrite', True, True)
-        self.assertTrue(datastore.Datastore.is_datastore_mount_usable(m))
-        m = MountInfo('read', True, True)
-        self.assertFalse(datastore.Datastore.is_datastore_mount_usable(m))
-        m = MountInfo('readWrite', False, True)
-        self.assertFalse(datastore.Datastore.is_datastore_mount_usable(m))
-        m = MountInfo('readWrite', True, False)
-        self.assertFalse(datastore.Datastore.is_datastore_mount_usable(m))
-        m = MountInfo('readWrite', False, False)
-        self.assertFalse(datastore.Datastore.is_datastore_mount_usable(m))
-        m = MountInfo('readWrite', None, None)
-        self.assertFalse(datastore.Datastore.is_datastore_mount_usable(m))
-        m = MountInfo('readWrite', None, True)
-        self.assertFalse(datastore.Datastore.is_datastore_mount_usable(m))
+    @ddt.data((('readWrite', True, True), True),
+              (('read', True, True), False),
+              (('readWrite', False, True), False),
+              (('readWrite', True, False), False),
+              (('readWrite', False, False), False),
+              (('readWrite', None, None), False),
+              (('readWrite', None, True), False))
+    @ddt.unpack
+    def test_is_datastore_mount_usable(self, mount_info_args, expected):
+        m = MountInfo(*mount_info_args)
+        self.assertEqual(
+            expected, bool(datastore.Datastore.is_datastore_mount_usable(m)))
 
 
 class DatastoreClusterTestCase(base.TestCase):
 
     def test_get_dsc_with_moid(self):
-        session = mock.Mock()
-        session.invoke_api = mock.Mock()
-        session.invoke_api.return_value = 'ds-cluster'
+        session = _create_session(return_value='ds-cluster')
         dsc_moid = 'group-p123'
         dsc_ref, dsc_name = datastore.get_dsc_ref_and_name(session, dsc_moid)
         self.assertEqual((dsc_moid, 'StoragePod'),
@@ -188,66 +184,58 @@ class DatastoreClusterTestCase(base.TestCase):
                                                    mock.ANY,
                                                    'name')
 
-    @mock.patch('oslo_vmware.vim_util.continue_retrieval')
-    @mock.patch('oslo_vmware.vim_util.cancel_retrieval')
-    def test_get_dsc_by_name(self, cancel_retrieval, continue_retrieval):
-        pod_prop = mock.Mock()
-        pod_prop.val = 'ds-cluster'
+    def test_get_dsc_by_name(self):
         pod_ref = vim_util.get_moref('group-p456', 'StoragePod')
-        pod = mock.Mock()
-        pod.propSet = [pod_prop]
-        pod.obj = pod_ref
+        pod = types.SimpleNamespace(
+            propSet=[types.SimpleNamespace(val='ds-cluster')], obj=pod_ref)
+        retrieve_result = types.SimpleNamespace(objects=[pod])
 
-        retrieve_result = mock.Mock()
-        retrieve_result.objects = [pod]
-
-        session = mock.Mock()
-        session.invoke_api = mock.Mock()
-        session.invoke_api.return_value = retrieve_result
+        session = _create_session(return_value=retrieve_result)
         name = 'ds-cluster'
-        dsc_ref, dsc_name = datastore.get_dsc_ref_and_name(session, name)
+        with mock.patch.object(vim_util, 'continue_retrieval'), \
+                mock.patch.object(vim_util,
+                                  'cancel_retrieval') as cancel_retrieval:
+            dsc_ref, dsc_name = datastore.get_dsc_ref_and_name(session, name)
+        cancel_retrieval.assert_called_once_with(session.vim,
+                                                 retrieve_result)
         self.assertEqual((vim_util.get_moref_value(pod_ref),
                           vim_util.get_moref_type(pod_ref)),
                          (vim_util.get_moref_value(dsc_ref),
                           vim_util.get_moref_type(dsc_ref)))
 
 
+@ddt.ddt
 class DatastorePathTestCase(base.TestCase):
 
     """Test the DatastorePath object."""
 
+    _CANONICAL_PATH = datastore.DatastorePath('dsname', 'a/b/c', 'x.vmdk')
+    _CANONICAL_STR = str(_CANONICAL_PATH)
+
     def test_ds_path(self):
         p = datastore.DatastorePath('dsname', 'a/b/c', 'file.iso')
-        self.assertEqual('[dsname] a/b/c/file.iso', str(p))
-        self.assertEqual('a/b/c/file.iso', p.rel_path)
-        self.assertEqual('a/b/c', p.parent.rel_path)
-        self.assertEqual('[dsname] a/b/c', str(p.parent))
-        self.assertEqual('dsname', p.datastore)
-        self.assertEqual('file.iso', p.basename)
-        self.assertEqual('a/b/c', p.dirname)
-
-    def test_ds_path_no_ds_name(self):
-        bad_args = [
-            ('', ['a/b/c', 'file.iso']),
-            (None, ['a/b/c', 'file.iso'])]
-        for t in bad_args:
-            self.assertRaises(
-                ValueError, datastore.DatastorePath,
-                t[0], *t[1])
-
-    def test_ds_path_invalid_path_components(self):
-        bad_args = [
-            ('dsname', [None]),
-            ('dsname', ['', None]),
-            ('dsname', ['a', None]),
-            ('dsname', ['a', None, 'b']),
-            ('dsname', [None, '']),
-            ('dsname', [None, 'b'])]
-
-        for t in bad_args:
-            self.assertRaises(
-                ValueError, datastore.DatastorePath,
-                t[0], *t[1])
+        parent = p.parent
+        self.assertEqual(('[dsname] a/b/c/file.iso', 'a/b/c/file.iso',
+                          'a/b/c', '[dsname] a/b/c', 'dsname', 'file.iso',
+                          'a/b/c'),
+                         (str(p), p.rel_path, parent.rel_path, str(parent),
+                          p.datastore, p.basename, p.dirname))
+
+    @ddt.data(
+        # no datastore name
+        ('', ['a/b/c', 'file.iso']),
+        (None, ['a/b/c', 'file.iso']),
+        # invalid path components
+        ('dsname', [None]),
+        ('dsname', ['', None]),
+        ('dsname', ['a', None]),
+        ('dsname', ['a', None, 'b']),
+        ('dsname', [None, '']),
+        ('dsname', [None, 'b']))
+    @ddt.unpack
+    def test_ds_path_invalid_args(self, ds_name, paths):
+        self.assertRaises(ValueError, datastore.DatastorePath,
+                          ds_name, *paths)
 
     def test_ds_path_no_subdir(self):
         args = [
@@ -259,9 +247,10 @@ class DatastorePathTestCase(base.TestCase):
         self.assertEqual('', canonical_p.dirname)
         self.assertEqual('x.vmdk', canonical_p.basename)
         self.assertEqual('x.vmdk', canonical_p.rel_path)
+        canonical_str = str(canonical_p)
         for t in args:
             p = datastore.DatastorePath(t[0], *t[1])
-            self.assertEqual(str(canonical_p), str(p))
+            self.assertEqual(canonical_str, str(p))
 
     def test_ds_path_ds_only(self):
         args = [
@@ -274,10 +263,12 @@ class DatastorePathTestCase(base.TestCase):
         self.assertEqual('', canonical_p.rel_path)
         self.assertEqual('', canonical_p.basename)
         self.assertEqual('', canonical_p.dirname)
+        canonical_str = str(canonical_p)
+        canonical_rel = canonical_p.rel_path
         for t in args:
             p = datastore.DatastorePath(t[0], *t[1])
-            self.assertEqual(str(canonical_p), str(p))
-            self.assertEqual(canonical_p.rel_path, p.rel_path)
+            self.assertEqual(canonical_str, str(p))
+            self.assertEqual(canonical_rel, p.rel_path)
 
     def test_ds_path_equivalence(self):
         args = [
@@ -286,13 +277,17 @@ class DatastorePathTestCase(base.TestCase):
             ('dsname', ['a', 'b', 'c', 'x.vmdk']),
             ('dsname', ['a/b/c', 'x.vmdk'])]
 
-        canonical_p = datastore.DatastorePath('dsname', 'a/b/c', 'x.vmdk')
+        canonical_p = self._CANONICAL_PATH
+        canonical_str = self._CANONICAL_STR
+        canonical_ds = canonical_p.datastore
+        canonical_rel = canonical_p.rel_path
+        canonical_parent_str = str(canonical_p.parent)
         for t in args:
             p = datastore.DatastorePath(t[0], *t[1])
-            self.assertEqual(str(canonical_p), str(p))
-            self.assertEqual(canonical_p.datastore, p.datastore)
-            self.assertEqual(canonical_p.rel_path, p.rel_path)
-            self.assertEqual(str(canonical_p.parent), str(p.parent))
+            self.assertEqual(canonical_str, str(p))
+            self.assertEqual(canonical_ds, p.datastore)
+            self.assertEqual(canonical_rel, p.rel_path)
+            self.assertEqual(canonical_parent_str, str(p.parent))
 
     def test_ds_path_non_equivalence(self):
         args = [
@@ -308,10 +303,9 @@ class DatastorePathTestCase(base.TestCase):
             ('dsname', ['/a/b/c/', 'x.vmdk ']),
             ('dsname', ['a/b/c/ ', 'x.vmdk'])]
 
-        canonical_p = datastore.DatastorePath('dsname', 'a/b/c', 'x.vmdk')
         for t in args:
             p = datastore.DatastorePath(t[0], *t[1])
-            self.assertNotEqual(str(canonical_p), str(p))
+            self.assertNotEqual(self._CANONICAL_STR, str(p))
 
     def test_equal(self):
         a = datastore.DatastorePath('ds_name', 'a')
@@ -323,15 +317,13 @@ class DatastorePathTestCase(base.TestCase):
         ds_path = p.join('b')
         self.assertEqual('[ds_name] a/b', str(ds_path))
 
-        p = datastore.DatastorePath('ds_name', 'a')
         ds_path = p.join()
-        bad_args = [
-            [None],
-            ['', None],
-            ['a', None],
-            ['a', None, 'b']]
-        for arg in bad_args:
-            self.assertRaises(ValueError, p.join, *arg)
+        self.assertEqual('[ds_name] a', str(ds_path))
+
+    @ddt.data([None], ['', None], ['a', None], ['a', None, 'b'])
+    def test_join_invalid_paths(self, paths):
+        p = datastore.DatastorePath('ds_name', 'a')
+        self.assertRaises(ValueError, p.join, *paths)
 
     def test_ds_path_parse(self):
         p = datastore.DatastorePath.parse('[dsname]')
@@ -346,131 +338,82 @@ class DatastorePathTestCase(base.TestCase):
         self.assertEqual('dsname', p.datastore)
         self.assertEqual('folder/file', p.rel_path)
 
-        for p in [None, '']:
-            self.assertRaises(ValueError, datastore.DatastorePath.parse, p)
-
-        for p in ['bad path', '/a/b/c', 'a/b/c']:
-            self.assertRaises(IndexError, datastore.DatastorePath.parse, p)
+    @ddt.data((None, ValueError),
+              ('', ValueError),
+              ('bad path', IndexError),
+              ('/a/b/c', IndexError),
+              ('a/b/c', IndexError))
+    @ddt.unpack
+    def test_ds_path_parse_invalid(self, path, exc_cls):
+        self.assertRaises(exc_cls, datastore.DatastorePath.parse, path)
 
 
 class DatastoreURLTestCase(base.TestCase):
 
     """Test the DatastoreURL object."""
 
+    _SERVER = '13.37.73.31'
+    _DC_PATH = 'datacenter-1'
+    _DS_NAME = 'datastore-1'
+    _QUERY = urlparse.urlencode({'dcPath': _DC_PATH, 'dsName': _DS_NAME})
+    _URL_TEMPLATE = 'https://' + _SERVER + '/folder/%s?' + _QUERY
+    _PATH = 'images/aa.vmdk'
+    _URL = _URL_TEMPLATE % _PATH
+    # Shared by the tests which only read its attributes.
+    _PARSED_URL = datastore.DatastoreURL.urlparse(_URL)
+
+    def _test_path(self, path, expected_path):
+        url = datastore.DatastoreURL('https', self._SERVER, path,
+                                     self._DC_PATH, self._DS_NAME)
+        self.assertEqual(self._URL_TEMPLATE % expected_path, str(url))
+
     def test_path_strip(self):
-        scheme = 'https'
-        server = '13.37.73.31'
         path = 'images/ubuntu-14.04.vmdk'
-        dc_path = 'datacenter-1'
-        ds_name = 'datastore-1'
-        params = {'dcPath': dc_path, 'dsName': ds_name}
-        query = urlparse.urlencode(params)
-        url = datastore.DatastoreURL(scheme, server, path, dc_path, ds_name)
-        expected_url = '%s://%s/folder/%s?%s' % (
-            scheme, server, path, query)
-        self.assertEqual(expected_url, str(url))
+        self._test_path(path, path)
 
     def test_path_lstrip(self):
-        scheme = 'https'
-        server = '13.37.73.31'
         path = '/images/ubuntu-14.04.vmdk'
-        dc_path = 'datacenter-1'
-        ds_name = 'datastore-1'
-        params = {'dcPath': dc_path, 'dsName': ds_name}
-        query = urlparse.urlencode(params)
-        url = datastore.DatastoreURL(scheme, server, path, dc_path, ds_name)
-        expected_url = '%s://%s/folder/%s?%s' % (
-            scheme, server, path.lstrip('/'), query)
-        self.assertEqual(expected_url, str(url))
+        self._test_path(path, path.lstrip('/'))
 
     def test_path_rstrip(self):
-        scheme = 'https'
-        server = '13.37.73.31'
         path = 'images/ubuntu-14.04.vmdk/'
-        dc_path = 'datacenter-1'
-        ds_name = 'datastore-1'
-        params = {'dcPath': dc_path, 'dsName': ds_name}
-        query = urlparse.urlencode(params)
-        url = datastore.DatastoreURL(scheme, server, path, dc_path, ds_name)
-        expected_url = '%s://%s/folder/%s?%s' % (
-            scheme, server, path.rstrip('/'), query)
-        self.assertEqual(expected_url, str(url))
+        self._test_path(path, path.rstrip('/'))
 
     def test_urlparse(self):
-        dc_path = 'datacenter-1'
-        ds_name = 'datastore-1'
-        params = {'dcPath': dc_path, 'dsName': ds_name}
-        query = urlparse.urlencode(params)
-        url = 'https://13.37.73.31/folder/images/aa.vmdk?%s' % query
-        ds_url = datastore.DatastoreURL.urlparse(url)
-        self.assertEqual(url, str(ds_url))
+        ds_url = datastore.DatastoreURL.urlparse(self._URL)
+        self.assertEqual(self._URL, str(ds_url))
 
     def test_datastore_name(self):
-        dc_path = 'datacenter-1'
-        ds_name = 'datastore-1'
-        params = {'dcPath': dc_path, 'dsName': ds_name}
-        query = urlparse.urlencode(params)
-        url = 'https://13.37.73.31/folder/images/aa.vmdk?%s' % query
-        ds_url = datastore.DatastoreURL.urlparse(url)
-        self.assertEqual(ds_name, ds_url.datastore_name)
+        self.assertEqual(self._DS_NAME, self._PARSED_URL.datastore_name)
 
     def test_datacenter_path(self):
-        dc_path = 'datacenter-1'
-        ds_name = 'datastore-1'
-        params = {'dcPath': dc_path, 'dsName': ds_name}
-        query = urlparse.urlencode(params)
-        url = 'https://13.37.73.31/folder/images/aa.vmdk?%s' % query
-        ds_url = datastore.DatastoreURL.urlparse(url)
-        self.assertEqual(dc_path, ds_url.datacenter_path)
+        self.assertEqual(self._DC_PATH, self._PARSED_URL.datacenter_path)
 
     def test_path(self):
-        dc_path = 'datacenter-1'
-        ds_name = 'datastore-1'
-        params = {'dcPath': dc_path, 'dsName': ds_name}
-        path = 'images/aa.vmdk'
-        query = urlparse.urlencode(params)
-        url = 'https://13.37.73.31/folder/%s?%s' % (path, query)
-        ds_url = datastore.DatastoreURL.urlparse(url)
-        self.assertEqual(path, ds_url.path)
-
-    @mock.patch('http.client.HTTPSConnection')
+        self.assertEqual(self._PATH, self._PARSED_URL.path)
+
+    @mock.patch.object(httplib, 'HTTPSConnection')
     def test_connect(self, mock_conn):
-        dc_path = 'datacenter-1'
-        ds_name = 'datastore-1'
-        params = {'dcPath': dc_path, 'dsName': ds_name}
-        query = urlparse.urlencode(params)
-        url = 'https://13.37.73.31/folder/images/aa.vmdk?%s' % query
-        ds_url = datastore.DatastoreURL.urlparse(url)
+        ds_url = datastore.DatastoreURL.urlparse(self._URL)
         cookie = mock.Mock()
         ds_url.connect('PUT', 128, cookie)
-        mock_conn.assert_called_once_with('13.37.73.31')
+        mock_conn.assert_called_once_with(self._SERVER)
 
     def test_get_transfer_ticket(self):
-        dc_path = 'datacenter-1'
-        ds_name = 'datastore-1'
-        params = {'dcPath': dc_path, 'dsName': ds_name}
-        query = urlparse.urlencode(params)
-        url = 'https://13.37.73.31/folder/images/aa.vmdk?%s' % query
-        session = mock.Mock()
-        session.invoke_api = mock.Mock()
-
-        class Ticket(object):
-            id = 'fake_id'
-        session.invoke_api.return_value = Ticket()
-        ds_url = datastore.DatastoreURL.urlparse(url)
+        session = _create_session(
+            return_value=types.SimpleNamespace(id='fake_id'))
+        ds_url = datastore.DatastoreURL.urlparse(self._URL)
         ticket = ds_url.get_transfer_ticket(session, 'PUT')
         self.assertEqual('%s="%s"' % (constants.CGI_COOKIE_KEY, 'fake_id'),
                          ticket)
 
     def test_get_datastore_by_ref(self):
-        session = mock.Mock()
         ds_ref = mock.Mock()
         expected_props = {'summary.name': 'datastore1',
                           'summary.type': 'NFS',
                           'summary.freeSpace': 1000,
                           'summary.capacity': 2000}
-        session.invoke_api = mock.Mock()
-        session.invoke_api.return_value = expected_props
+        session = _create_session(return_value=expected_props)
         ds_obj = datastore.get_datastore_by_ref(session, ds_ref)
         self.assertEqual(expected_props['summary.name'], ds_obj.name)
         self.assertEqual(expected_props['summary.type'], ds_obj.type)
@@ -16,7 +16,9 @@
 
 """Unit tests for session management and API invocation classes."""
 
+import collections
 from datetime import datetime
+import types
 from unittest import mock
 
 from eventlet import greenthread
@@ -30,6 +32,34 @@ from oslo_vmware.tests import base
 from oslo_vmware import vim_util
 
 
+_QUEUE_TIME = datetime(2016, 12, 6, 15, 29, 43, 79060)
+_COMPLETE_TIME = datetime(2016, 12, 6, 15, 29, 50, 79060)
+
+
+def _create_responder(responses):
+    """Return a callable which replays the given responses in order.
+
+    Responses which are exceptions are raised instead of being returned.
+    """
+    responses = collections.deque(responses)
+
+    def respond(*args, **kwargs):
+        response = responses.popleft()
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    return respond
+
+
+def _create_task_infos(*states):
+    return [types.SimpleNamespace(state=state,
+                                  progress=progress,
+                                  queueTime=_QUEUE_TIME,
+                                  completeTime=_COMPLETE_TIME)
+            for state, progress in states]
+
+
 class RetryDecoratorTest(base.TestCase):
     """Tests for retry decorator class."""
 
@@ -51,40 +81,46 @@ class RetryDecoratorTest(base.TestCase):
 
     def test_retry_with_expected_exceptions(self):
         result = "RESULT"
-        responses = [exceptions.VimSessionOverLoadException(None),
-                     exceptions.VimSessionOverLoadException(None),
-                     result]
-
-        def func(*args, **kwargs):
-            response = responses.pop(0)
-            if isinstance(response, Exception):
-                raise response
-            return response
+        func = _create_responder(
+            [exceptions.VimSessionOverLoadException(None),
+             exceptions.VimSessionOverLoadException(None),
+             result])
 
         sleep_time_incr = 0.01
         retry_count = 2
         retry = api.RetryDecorator(10, sleep_time_incr, 10,
                                    (exceptions.VimSessionOverLoadException,))
-        self.assertEqual(result, retry(func)())
+        with mock.patch.object(greenthread, 'sleep') as sleep_mock:
+            self.assertEqual(result, retry(func)())
+        sleep_mock.assert_has_calls([mock.call(sleep_time_incr),
+                                     mock.call(2 * sleep_time_incr)])
+        self.assertEqual(retry_count, sleep_mock.call_count)
         self.assertTrue(retry._retry_count == retry_count)
         self.assertEqual(retry_count * sleep_time_incr, retry._sleep_time)
 
     def test_retry_with_max_retries(self):
-        responses = [exceptions.VimSessionOverLoadException(None),
-                     exceptions.VimSessionOverLoadException(None),
-                     exceptions.VimSessionOverLoadException(None)]
-
-        def func(*args, **kwargs):
-            response = responses.pop(0)
-            if isinstance(response, Exception):
-                raise response
-            return response
+        func = _create_responder(
+            [exceptions.VimSessionOverLoadException(None)] * 3)
 
         retry = api.RetryDecorator(2, 0, 0,
                                    (exceptions.VimSessionOverLoadException,))
         self.assertRaises(exceptions.VimSessionOverLoadException, retry(func))
         self.assertTrue(retry._retry_count == 2)
 
+    @mock.patch.object(greenthread, 'spawn')
+    @mock.patch.object(greenthread, 'sleep')
+    def test_retry_sleep_time_capped(self, sleep_mock, spawn_mock):
+        func = _create_responder(
+            [exceptions.VimSessionOverLoadException(None)] * 3 + ["RESULT"])
+
+        retry = api.RetryDecorator(5, 10, 15,
+                                   (exceptions.VimSessionOverLoadException,))
+        self.assertEqual("RESULT", retry(func)())
+        self.assertEqual([mock.call(10), mock.call(15), mock.call(15)],
+                         sleep_mock.call_args_list)
+        self.assertEqual(3, retry._retry_count)
+        self.assertFalse(spawn_mock.called)
+
     def test_retry_with_unexpected_exception(self):
 
         def func(*args, **kwargs):
@@ -104,13 +140,27 @@ class VMwareAPISessionTest(base.TestCase):
     PASSWORD = 'password'  # nosec
     POOL_SIZE = 15
 
+    @classmethod
+    def setUpClass(cls):
+        super(VMwareAPISessionTest, cls).setUpClass()
+        # Each Vim() call returns a new MagicMock, so the patch can be shared
+        # by all the tests in this class.
+        cls._vim_patcher = mock.patch('oslo_vmware.vim.Vim')
+        cls.VimMock = cls._vim_patcher.start()
+        cls.VimMock.side_effect = lambda *args, **kw: mock.MagicMock()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._vim_patcher.stop()
+        super(VMwareAPISessionTest, cls).tearDownClass()
+
     def setUp(self):
         super(VMwareAPISessionTest, self).setUp()
-        patcher = mock.patch('oslo_vmware.vim.Vim')
-        self.addCleanup(patcher.stop)
-        self.VimMock = patcher.start()
-        self.VimMock.side_effect = lambda *args, **kw: mock.MagicMock()
+        self.VimMock.reset_mock()
         self.cert_mock = mock.Mock()
+        sleep_patcher = mock.patch.object(greenthread, 'sleep')
+        self.addCleanup(sleep_patcher.stop)
+        self.sleep_mock = sleep_patcher.start()
 
     def _create_api_session(self, _create_session, retry_count=10,
                             task_poll_interval=1):
@@ -138,7 +188,17 @@ class VMwareAPISessionTest(base.TestCase):
             insecure=False,
             pool_maxsize=VMwareAPISessionTest.POOL_SIZE,
             connection_timeout=None,
-            op_id_prefix='oslo.vmware')
+            op_id_prefix='oslo.vmware',
+            pool_connections=None)
+
+    def test_vim_with_pool_connections(self):
+        api_session = api.VMwareAPISession(VMwareAPISessionTest.SERVER_IP,
+                                           VMwareAPISessionTest.USERNAME,
+                                           VMwareAPISessionTest.PASSWORD,
+                                           10, 1, create_session=False,
+                                           pool_connections=2)
+        api_session.vim
+        self.assertEqual(2, self.VimMock.call_args[1]['pool_connections'])
 
     @mock.patch.object(pbm, 'Pbm')
     def test_pbm(self, pbm_mock):
@@ -156,8 +216,7 @@ class VMwareAPISessionTest(base.TestCase):
         pbm.set_soap_cookie.assert_called_once_with(cookie)
 
     def test_create_session(self):
-        session = mock.Mock()
-        session.key = "12345"
+        session = mock.Mock(key="12345")
         api_session = self._create_api_session(False)
         cookie = mock.Mock()
         vim_obj = api_session.vim
@@ -179,8 +238,7 @@ class VMwareAPISessionTest(base.TestCase):
     def test_create_session_with_existing_inactive_session(self):
         old_session_key = '12345'
         new_session_key = '67890'
-        session = mock.Mock()
-        session.key = new_session_key
+        session = mock.Mock(key=new_session_key)
         api_session = self._create_api_session(False)
         api_session._session_id = old_session_key
         api_session._session_username = api_session._server_username
@@ -221,19 +279,16 @@ class VMwareAPISessionTest(base.TestCase):
         def api(*args, **kwargs):
             return response
 
-        module = mock.Mock()
-        module.api = api
+        module = mock.Mock(api=api)
         ret = api_session.invoke_api(module, 'api')
         self.assertEqual(response, ret)
 
     def test_logout_with_exception(self):
-        session = mock.Mock()
-        session.key = "12345"
         api_session = self._create_api_session(False)
+        api_session._session_id = "12345"
+        api_session._session_username = api_session._server_username
         vim_obj = api_session.vim
-        vim_obj.Login.return_value = session
         vim_obj.Logout.side_effect = exceptions.VimFaultException([], None)
-        api_session._create_session()
         api_session.logout()
         self.assertEqual("12345", api_session._session_id)
 
@@ -244,21 +299,15 @@ class VMwareAPISessionTest(base.TestCase):
         self.assertEqual(0, vim_obj.Logout.call_count)
 
     def test_logout_calls_vim_logout(self):
-        session = mock.Mock()
-        session.key = "12345"
         api_session = self._create_api_session(False)
+        api_session._session_id = "12345"
+        api_session._session_username = api_session._server_username
         vim_obj = api_session.vim
-        vim_obj.Login.return_value = session
         vim_obj.Logout.return_value = None
 
-        api_session._create_session()
-        session_manager = vim_obj.service_content.sessionManager
-        vim_obj.Login.assert_called_once_with(
-            session_manager, userName=VMwareAPISessionTest.USERNAME,
-            password=VMwareAPISessionTest.PASSWORD, locale='en')
         api_session.logout()
         vim_obj.Logout.assert_called_once_with(
-            session_manager)
+            vim_obj.service_content.sessionManager)
         self.assertIsNone(api_session._session_id)
 
     def test_invoke_api_with_expected_exception(self):
@@ -267,19 +316,12 @@ class VMwareAPISessionTest(base.TestCase):
         vim_obj = api_session.vim
         vim_obj.SessionIsActive.return_value = False
         ret = mock.Mock()
-        responses = [exceptions.VimConnectionException(None), ret]
-
-        def api(*args, **kwargs):
-            response = responses.pop(0)
-            if isinstance(response, Exception):
-                raise response
-            return response
-
-        module = mock.Mock()
-        module.api = api
-        with mock.patch.object(greenthread, 'sleep'):
-            self.assertEqual(ret, api_session.invoke_api(module, 'api'))
+        api = _create_responder(
+            [exceptions.VimConnectionException(None), ret])
+        module = mock.Mock(api=api)
+        self.assertEqual(ret, api_session.invoke_api(module, 'api'))
         api_session._create_session.assert_called_once_with()
+        self.sleep_mock.assert_called_once_with(10)
 
     def test_invoke_api_not_recreate_session(self):
         api_session = self._create_api_session(True)
@@ -287,18 +329,10 @@ class VMwareAPISessionTest(base.TestCase):
         vim_obj = api_session.vim
         vim_obj.SessionIsActive.return_value = True
         ret = mock.Mock()
-        responses = [exceptions.VimConnectionException(None), ret]
-
-        def api(*args, **kwargs):
-            response = responses.pop(0)
-            if isinstance(response, Exception):
-                raise response
-            return response
-
-        module = mock.Mock()
-        module.api = api
-        with mock.patch.object(greenthread, 'sleep'):
-            self.assertEqual(ret, api_session.invoke_api(module, 'api'))
+        api = _create_responder(
+            [exceptions.VimConnectionException(None), ret])
+        module = mock.Mock(api=api)
+        self.assertEqual(ret, api_session.invoke_api(module, 'api'))
         self.assertFalse(api_session._create_session.called)
 
     def test_invoke_api_with_vim_fault_exception(self):
@@ -307,8 +341,7 @@ class VMwareAPISessionTest(base.TestCase):
         def api(*args, **kwargs):
             raise exceptions.VimFaultException([], None)
 
-        module = mock.Mock()
-        module.api = api
+        module = mock.Mock(api=api)
         self.assertRaises(exceptions.VimFaultException,
                           api_session.invoke_api,
                           module,
@@ -344,8 +377,7 @@ class VMwareAPISessionTest(base.TestCase):
             raise exceptions.VimFaultException(
                 [exceptions.NOT_AUTHENTICATED], None)
 
-        module = mock.Mock()
-        module.api = api
+        module = mock.Mock(api=api)
         ret = api_session.invoke_api(module, 'api')
         self.assertEqual([], ret)
         vim_obj.SessionIsActive.assert_called_once_with(
@@ -359,19 +391,12 @@ class VMwareAPISessionTest(base.TestCase):
         vim_obj = api_session.vim
         vim_obj.SessionIsActive.return_value = False
         result = mock.Mock()
-        responses = [exceptions.VimFaultException(
-            [exceptions.NOT_AUTHENTICATED], None), result]
-
-        def api(*args, **kwargs):
-            response = responses.pop(0)
-            if isinstance(response, Exception):
-                raise response
-            return response
-
-        module = mock.Mock()
-        module.api = api
-        with mock.patch.object(greenthread, 'sleep'):
-            ret = api_session.invoke_api(module, 'api')
+        api = _create_responder(
+            [exceptions.VimFaultException([exceptions.NOT_AUTHENTICATED],
+                                          None),
+             result])
+        module = mock.Mock(api=api)
+        ret = api_session.invoke_api(module, 'api')
         self.assertEqual(result, ret)
         vim_obj.SessionIsActive.assert_called_once_with(
             vim_obj.service_content.sessionManager,
@@ -392,29 +417,19 @@ class VMwareAPISessionTest(base.TestCase):
                                'api')
         self.assertEqual(fault_list, ex.fault_list)
 
-    @mock.patch.object(context, 'get_current')
-    def test_wait_for_task(self, mock_curr_ctx):
-        ctx = mock.Mock()
-        mock_curr_ctx.return_value = ctx
+    def _test_wait_for_task(self, ctx):
         api_session = self._create_api_session(True)
-        task_info_list = [('queued', 0), ('running', 40), ('success', 100)]
+        task_info_list = _create_task_infos(('queued', 0), ('running', 40),
+                                            ('success', 100))
         task_info_list_size = len(task_info_list)
 
-        def invoke_api_side_effect(module, method, *args, **kwargs):
-            (state, progress) = task_info_list.pop(0)
-            task_info = mock.Mock()
-            task_info.progress = progress
-            task_info.queueTime = datetime(2016, 12, 6, 15, 29, 43, 79060)
-            task_info.completeTime = datetime(2016, 12, 6, 15, 29, 50, 79060)
-            task_info.state = state
-            return task_info
-
-        api_session.invoke_api = mock.Mock(side_effect=invoke_api_side_effect)
+        api_session.invoke_api = mock.Mock(side_effect=task_info_list)
         task = mock.Mock()
-        with mock.patch.object(greenthread, 'sleep'):
+        with mock.patch.object(context, 'get_current',
+                               return_value=ctx) as mock_curr_ctx:
             ret = api_session.wait_for_task(task)
-            self.assertEqual('success', ret.state)
-            self.assertEqual(100, ret.progress)
+        self.assertEqual('success', ret.state)
+        self.assertEqual(100, ret.progress)
         api_session.invoke_api.assert_called_with(vim_util,
                                                   'get_object_property',
                                                   api_session.vim, task,
@@ -423,57 +438,31 @@ class VMwareAPISessionTest(base.TestCase):
         self.assertEqual(task_info_list_size,
                          api_session.invoke_api.call_count)
         mock_curr_ctx.assert_called_once()
-        self.assertEqual(3, ctx.update_store.call_count)
 
-    @mock.patch.object(context, 'get_current', return_value=None)
-    def test_wait_for_task_no_ctx(self, mock_curr_ctx):
-        api_session = self._create_api_session(True)
-        task_info_list = [('queued', 0), ('running', 40), ('success', 100)]
-        task_info_list_size = len(task_info_list)
+    def test_wait_for_task(self):
+        ctx = mock.Mock()
+        self._test_wait_for_task(ctx)
+        self.assertEqual(3, ctx.update_store.call_count)
 
-        def invoke_api_side_effect(module, method, *args, **kwargs):
-            (state, progress) = task_info_list.pop(0)
-            task_info = mock.Mock()
-            task_info.progress = progress
-            task_info.queueTime = datetime(2016, 12, 6, 15, 29, 43, 79060)
-            task_info.completeTime = datetime(2016, 12, 6, 15, 29, 50, 79060)
-            task_info.state = state
-            return task_info
-
-        api_session.invoke_api = mock.Mock(side_effect=invoke_api_side_effect)
-        task = mock.Mock()
-        with mock.patch.object(greenthread, 'sleep'):
-            ret = api_session.wait_for_task(task)
-            self.assertEqual('success', ret.state)
-            self.assertEqual(100, ret.progress)
-        api_session.invoke_api.assert_called_with(vim_util,
-                                                  'get_object_property',
-                                                  api_session.vim, task,
-                                                  'info',
-                                                  skip_op_id=True)
-        self.assertEqual(task_info_list_size,
-                         api_session.invoke_api.call_count)
-        mock_curr_ctx.assert_called_once()
+    def test_wait_for_task_no_ctx(self):
+        self._test_wait_for_task(None)
 
     @mock.patch.object(context, 'get_current')
     def test_wait_for_task_with_error_state(self, mock_curr_ctx):
         api_session = self._create_api_session(True)
-        task_info_list = [('queued', 0), ('running', 40), ('error', -1)]
+        error = types.SimpleNamespace(localizedMessage='Error message',
+                                      fault=types.SimpleNamespace())
+        task_info_list = [types.SimpleNamespace(state='queued', progress=0),
+                          types.SimpleNamespace(state='running', progress=40),
+                          types.SimpleNamespace(state='error', progress=-1,
+                                                error=error)]
         task_info_list_size = len(task_info_list)
 
-        def invoke_api_side_effect(module, method, *args, **kwargs):
-            (state, progress) = task_info_list.pop(0)
-            task_info = mock.Mock()
-            task_info.progress = progress
-            task_info.state = state
-            return task_info
-
-        api_session.invoke_api = mock.Mock(side_effect=invoke_api_side_effect)
+        api_session.invoke_api = mock.Mock(side_effect=task_info_list)
         task = mock.Mock()
-        with mock.patch.object(greenthread, 'sleep'):
-            self.assertRaises(exceptions.VimFaultException,
-                              api_session.wait_for_task,
-                              task)
+        self.assertRaises(exceptions.VimFaultException,
+                          api_session.wait_for_task,
+                          task)
         api_session.invoke_api.assert_called_with(vim_util,
                                                   'get_object_property',
                                                   api_session.vim, task,
@@ -489,10 +478,9 @@ class VMwareAPISessionTest(base.TestCase):
         api_session.invoke_api = mock.Mock(
             side_effect=exceptions.VimException(None))
         task = mock.Mock()
-        with mock.patch.object(greenthread, 'sleep'):
-            self.assertRaises(exceptions.VimException,
-                              api_session.wait_for_task,
-                              task)
+        self.assertRaises(exceptions.VimException,
+                          api_session.wait_for_task,
+                          task)
         api_session.invoke_api.assert_called_once_with(vim_util,
                                                        'get_object_property',
                                                        api_session.vim, task,
@@ -505,13 +493,9 @@ class VMwareAPISessionTest(base.TestCase):
         lease_states = ['initializing', 'ready']
         num_states = len(lease_states)
 
-        def invoke_api_side_effect(module, method, *args, **kwargs):
-            return lease_states.pop(0)
-
-        api_session.invoke_api = mock.Mock(side_effect=invoke_api_side_effect)
+        api_session.invoke_api = mock.Mock(side_effect=lease_states)
         lease = mock.Mock()
-        with mock.patch.object(greenthread, 'sleep'):
-            api_session.wait_for_lease_ready(lease)
+        api_session.wait_for_lease_ready(lease)
         api_session.invoke_api.assert_called_with(vim_util,
                                                   'get_object_property',
                                                   api_session.vim, lease,
@@ -519,19 +503,25 @@ class VMwareAPISessionTest(base.TestCase):
                                                   skip_op_id=True)
         self.assertEqual(num_states, api_session.invoke_api.call_count)
 
+    def test_wait_for_lease_ready_poll_interval(self):
+        api_session = self._create_api_session(True, task_poll_interval=2)
+        api_session.invoke_api = mock.Mock(
+            side_effect=['initializing'] * 4 + ['ready'])
+        lease = mock.Mock()
+        api_session.wait_for_lease_ready(lease)
+        self.assertEqual(4, self.sleep_mock.call_count)
+        for call in self.sleep_mock.call_args_list:
+            self.assertAlmostEqual(2, call[0][0], places=1)
+        self.assertEqual(5, api_session.invoke_api.call_count)
+
     def test_wait_for_lease_ready_with_error_state(self):
         api_session = self._create_api_session(True)
-        responses = ['initializing', 'error', 'error_msg']
-
-        def invoke_api_side_effect(module, method, *args, **kwargs):
-            return responses.pop(0)
-
-        api_session.invoke_api = mock.Mock(side_effect=invoke_api_side_effect)
+        api_session.invoke_api = mock.Mock(
+            side_effect=['initializing', 'error', 'error_msg'])
         lease = mock.Mock()
-        with mock.patch.object(greenthread, 'sleep'):
-            self.assertRaises(exceptions.VimException,
-                              api_session.wait_for_lease_ready,
-                              lease)
+        self.assertRaises(exceptions.VimException,
+                          api_session.wait_for_lease_ready,
+                          lease)
         exp_calls = [mock.call(vim_util, 'get_object_property',
                                api_session.vim, lease, 'state',
                                skip_op_id=True)] * 2
@@ -541,11 +531,7 @@ class VMwareAPISessionTest(base.TestCase):
 
     def test_wait_for_lease_ready_with_unknown_state(self):
         api_session = self._create_api_session(True)
-
-        def invoke_api_side_effect(module, method, *args, **kwargs):
-            return 'unknown'
-
-        api_session.invoke_api = mock.Mock(side_effect=invoke_api_side_effect)
+        api_session.invoke_api = mock.Mock(return_value='unknown')
         lease = mock.Mock()
         self.assertRaises(exceptions.VimException,
                           api_session.wait_for_lease_ready,
@@ -568,21 +554,15 @@ class VMwareAPISessionTest(base.TestCase):
             vim_util, 'get_object_property', api_session.vim, lease,
             'state', skip_op_id=True)
 
-    def _poll_task_well_known_exceptions(self, fault,
+    def _poll_task_well_known_exceptions(self, api_session, fault,
                                          expected_exception):
-        api_session = self._create_api_session(False)
 
         def fake_invoke_api(self, module, method, *args, **kwargs):
-            task_info = mock.Mock()
-            task_info.progress = -1
-            task_info.state = 'error'
-            error = mock.Mock()
-            error.localizedMessage = "Error message"
             error_fault = mock.Mock()
             error_fault.__class__.__name__ = fault
-            error.fault = error_fault
-            task_info.error = error
-            return task_info
+            error = mock.Mock(localizedMessage="Error message",
+                              fault=error_fault)
+            return mock.Mock(progress=-1, state='error', error=error)
 
         with (
             mock.patch.object(api_session, 'invoke_api', fake_invoke_api)
@@ -595,8 +575,10 @@ class VMwareAPISessionTest(base.TestCase):
                               ctx)
 
     def test_poll_task_well_known_exceptions(self):
-        for k, v in exceptions._fault_classes_registry.items():
-            self._poll_task_well_known_exceptions(k, v)
+        api_session = self._create_api_session(False)
+        fault_classes = tuple(exceptions._fault_classes_registry.items())
+        for k, v in fault_classes:
+            self._poll_task_well_known_exceptions(api_session, k, v)
 
     def test_poll_task_unknown_exception(self):
         _unknown_exceptions = {
@@ -604,13 +586,14 @@ class VMwareAPISessionTest(base.TestCase):
             'RuntimeFault': exceptions.VimFaultException
         }
 
+        api_session = self._create_api_session(False)
         for k, v in _unknown_exceptions.items():
-            self._poll_task_well_known_exceptions(k, v)
+            self._poll_task_well_known_exceptions(api_session, k, v)
 
     def test_update_pbm_wsdl_loc(self):
-        session = mock.Mock()
-        session.key = "12345"
         api_session = self._create_api_session(False)
         self.assertIsNone(api_session._pbm_wsdl_loc)
+        api_session._pbm = mock.sentinel.pbm
         api_session.pbm_wsdl_loc_set('fake_wsdl')
         self.assertEqual('fake_wsdl', api_session._pbm_wsdl_loc)
+        self.assertIsNone(api_session._pbm)
@@ -15,16 +15,15 @@
 
 """Unit tests for VMware DVS utility module."""
 
-import collections
+import types
 from unittest import mock
 
 from oslo_vmware import dvs_util
 from oslo_vmware.tests import base
 from oslo_vmware import vim_util
 
-ObjectContent = collections.namedtuple('ObjectContent', ['obj', 'propSet'])
-DynamicProperty = collections.namedtuple('Property', ['name', 'val'])
-Moref = collections.namedtuple('Moref', ['name', 'type'])
+_DVS_REF = dvs_util.get_dvs_moref('dvs-123')
+_PG_REF = vim_util.get_moref('dvportgroup-7', 'DistributedVirtualPortgroup')
 
 
 class DvsUtilTest(base.TestCase):
@@ -66,11 +65,9 @@ class DvsUtilTest(base.TestCase):
     @mock.patch.object(dvs_util, 'get_port_group_spec')
     def test_add_port_group(self, mock_spec):
         session = mock.Mock()
-        dvs_moref = dvs_util.get_dvs_moref('dvs-123')
-        spec = dvs_util.get_port_group_spec(session, 'pg', 7)
-        mock_spec.return_value = spec
-        pg_moref = vim_util.get_moref('dvportgroup-7',
-                                      'DistributedVirtualPortgroup')
+        dvs_moref = _DVS_REF
+        spec = mock_spec.return_value
+        pg_moref = _PG_REF
 
         def wait_for_task_side_effect(task):
             task_info = mock.Mock()
@@ -81,6 +78,7 @@ class DvsUtilTest(base.TestCase):
         pg = dvs_util.add_port_group(session, dvs_moref, 'pg',
                                      vlan_id=7)
         self.assertEqual(pg, pg_moref)
+        mock_spec.assert_called_once_with(session, 'pg', 7, trunk_mode=False)
         session.invoke_api.assert_called_once_with(
             session.vim, 'CreateDVPortgroup_Task', dvs_moref,
             spec=spec)
@@ -88,41 +86,43 @@ class DvsUtilTest(base.TestCase):
     @mock.patch.object(dvs_util, 'get_port_group_spec')
     def test_add_port_group_trunk(self, mock_spec):
         session = mock.Mock()
-        dvs_moref = dvs_util.get_dvs_moref('dvs-123')
-        spec = dvs_util.get_port_group_spec(session, 'pg', None,
-                                            trunk_mode=True)
-        mock_spec.return_value = spec
+        dvs_moref = _DVS_REF
+        spec = mock_spec.return_value
         dvs_util.add_port_group(session, dvs_moref, 'pg',
                                 trunk_mode=True)
+        mock_spec.assert_called_once_with(session, 'pg', None,
+                                          trunk_mode=True)
         session.invoke_api.assert_called_once_with(
             session.vim, 'CreateDVPortgroup_Task', dvs_moref,
             spec=spec)
 
     def test_get_portgroups_empty(self):
         session = mock.Mock()
-        dvs_moref = dvs_util.get_dvs_moref('dvs-123')
+        dvs_moref = _DVS_REF
         session.invoke_api.return_value = []
         pgs = dvs_util.get_portgroups(session, dvs_moref)
         self.assertEqual([], pgs)
 
     def test_get_portgroups(self):
         session = mock.Mock()
-        dvs_moref = dvs_util.get_dvs_moref('dvs-123')
-        pg_moref = vim_util.get_moref('dvportgroup-7',
-                                      'DistributedVirtualPortgroup')
+        dvs_moref = _DVS_REF
+        pg_moref = _PG_REF
+
+        # get_object_properties results keyed by the requested properties
+        results = {
+            ('portgroup',): [types.SimpleNamespace(
+                obj=dvs_moref,
+                propSet=[types.SimpleNamespace(name='portgroup',
+                                               val=[[pg_moref]])])],
+            ('name',): [types.SimpleNamespace(
+                obj=pg_moref,
+                propSet=[types.SimpleNamespace(name='name',
+                                               val='pg-name')])],
+        }
 
         def session_invoke_api_side_effect(module, method, *args, **kwargs):
             if module == vim_util and method == 'get_object_properties':
-                if ['portgroup'] in args:
-                    propSet = [DynamicProperty(name='portgroup',
-                                               val=[[pg_moref]])]
-                    return [ObjectContent(obj=dvs_moref,
-                                          propSet=propSet)]
-                if ['name'] in args:
-                    propSet = [DynamicProperty(name='name',
-                                               val='pg-name')]
-                    return [ObjectContent(obj=pg_moref,
-                                          propSet=propSet)]
+                return results.get(tuple(args[-1]))
 
         session.invoke_api.side_effect = session_invoke_api_side_effect
         session._call_method.return_value = []
@@ -16,11 +16,18 @@
 """Unit tests for exceptions module."""
 from unittest import mock
 
+import ddt
+
 from oslo_vmware._i18n import _
 from oslo_vmware import exceptions
 from oslo_vmware.tests import base
 
 
+class _VimSubClass(exceptions.VimException):
+    pass
+
+
+@ddt.ddt
 class ExceptionsTest(base.TestCase):
 
     def test_exception_summary_exception_as_list(self):
@@ -30,10 +37,13 @@ class ExceptionsTest(base.TestCase):
                           exceptions.VimException,
                           [], ValueError('foo'))
 
-    def test_exception_summary_string(self):
-        e = exceptions.VimException(_("string"), ValueError("foo"))
-        string = str(e)
-        self.assertEqual("string\nCause: foo", string)
+    @ddt.data((exceptions.VimException, (_("string"), ValueError("foo")),
+               "string\nCause: foo"),
+              (exceptions.NoDiskSpaceException, (),
+               "Insufficient disk space."))
+    @ddt.unpack
+    def test_exception_to_string(self, exc_cls, args, expected):
+        self.assertEqual(expected, str(exc_cls(*args)))
 
     def test_vim_fault_exception_string(self):
         self.assertRaises(ValueError,
@@ -61,20 +71,17 @@ class ExceptionsTest(base.TestCase):
                                "Faults: [ValueError('example')]\n"
                                "Details: {'foo': 'bar'}"])
 
-    def _create_subclass_exception(self):
-        class VimSubClass(exceptions.VimException):
-            pass
-        return VimSubClass
-
+    @mock.patch.dict(exceptions._fault_classes_registry)
     def test_register_fault_class(self):
-        exc = self._create_subclass_exception()
-        exceptions.register_fault_class('ValueError', exc)
-        self.assertEqual(exc, exceptions.get_fault_class('ValueError'))
+        exceptions.register_fault_class('ValueError', _VimSubClass)
+        self.assertEqual(_VimSubClass,
+                         exceptions.get_fault_class('ValueError'))
 
+    @mock.patch.dict(exceptions._fault_classes_registry)
     def test_register_fault_class_override(self):
-        exc = self._create_subclass_exception()
-        exceptions.register_fault_class(exceptions.ALREADY_EXISTS, exc)
-        self.assertEqual(exc,
+        exceptions.register_fault_class(exceptions.ALREADY_EXISTS,
+                                        _VimSubClass)
+        self.assertEqual(_VimSubClass,
                          exceptions.get_fault_class(exceptions.ALREADY_EXISTS))
 
     def test_register_fault_class_invalid(self):
@@ -82,43 +89,27 @@ class ExceptionsTest(base.TestCase):
                           exceptions.register_fault_class,
                           'ValueError', ValueError)
 
-    def test_log_exception_to_string(self):
-        self.assertEqual('Insufficient disk space.',
-                         str(exceptions.NoDiskSpaceException()))
-
-    def test_get_fault_class(self):
-        self.assertEqual(exceptions.AlreadyExistsException,
-                         exceptions.get_fault_class("AlreadyExists"))
-        self.assertEqual(exceptions.CannotDeleteFileException,
-                         exceptions.get_fault_class("CannotDeleteFile"))
-        self.assertEqual(exceptions.FileAlreadyExistsException,
-                         exceptions.get_fault_class("FileAlreadyExists"))
-        self.assertEqual(exceptions.FileFaultException,
-                         exceptions.get_fault_class("FileFault"))
-        self.assertEqual(exceptions.FileLockedException,
-                         exceptions.get_fault_class("FileLocked"))
-        self.assertEqual(exceptions.FileNotFoundException,
-                         exceptions.get_fault_class("FileNotFound"))
-        self.assertEqual(exceptions.InvalidPowerStateException,
-                         exceptions.get_fault_class("InvalidPowerState"))
-        self.assertEqual(exceptions.InvalidPropertyException,
-                         exceptions.get_fault_class("InvalidProperty"))
-        self.assertEqual(exceptions.NoPermissionException,
-                         exceptions.get_fault_class("NoPermission"))
-        self.assertEqual(exceptions.NotAuthenticatedException,
-                         exceptions.get_fault_class("NotAuthenticated"))
-        self.assertEqual(exceptions.TaskInProgress,
-                         exceptions.get_fault_class("TaskInProgress"))
-        self.assertEqual(exceptions.DuplicateName,
-                         exceptions.get_fault_class("DuplicateName"))
-        self.assertEqual(exceptions.NoDiskSpaceException,
-                         exceptions.get_fault_class("NoDiskSpace"))
-        self.assertEqual(exceptions.ToolsUnavailableException,
-                         exceptions.get_fault_class("ToolsUnavailable"))
-        self.assertEqual(exceptions.ManagedObjectNotFoundException,
-                         exceptions.get_fault_class("ManagedObjectNotFound"))
-        # Test unknown fault.
-        self.assertIsNone(exceptions.get_fault_class("NotAFile"))
+    @ddt.data(("AlreadyExists", exceptions.AlreadyExistsException),
+              ("CannotDeleteFile", exceptions.CannotDeleteFileException),
+              ("FileAlreadyExists", exceptions.FileAlreadyExistsException),
+              ("FileFault", exceptions.FileFaultException),
+              ("FileLocked", exceptions.FileLockedException),
+              ("FileNotFound", exceptions.FileNotFoundException),
+              ("InvalidPowerState", exceptions.InvalidPowerStateException),
+              ("InvalidProperty", exceptions.InvalidPropertyException),
+              ("NoPermission", exceptions.NoPermissionException),
+              ("NotAuthenticated", exceptions.NotAuthenticatedException),
+              ("TaskInProgress", exceptions.TaskInProgress),
+              ("DuplicateName", exceptions.DuplicateName),
+              ("NoDiskSpace", exceptions.NoDiskSpaceException),
+              ("ToolsUnavailable", exceptions.ToolsUnavailableException),
+              ("ManagedObjectNotFound",
+               exceptions.ManagedObjectNotFoundException),
+              # Test unknown fault.
+              ("NotAFile", None))
+    @ddt.unpack
+    def test_get_fault_class(self, name, fault_class):
+        self.assertIs(fault_class, exceptions.get_fault_class(name))
 
     def test_translate_fault(self):
 
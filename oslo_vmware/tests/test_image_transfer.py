@@ -33,6 +33,47 @@ class ImageTransferUtilityTest(base.TestCase):
         image_transfer._start_transfer(read_handle, write_handle, None)
         write_handle.write.assert_called_once_with(data)
 
+    def _test_start_transfer_chunk_size(self, chunk_size=None):
+        read_handle = mock.Mock()
+        read_handle.read.side_effect = [b'data-1', b'data-2', b'']
+        write_handle = mock.Mock()
+        image_transfer._start_transfer(read_handle, write_handle, None,
+                                       chunk_size=chunk_size)
+        exp_chunk_size = chunk_size or image_transfer.CHUNK_SIZE
+        self.assertEqual([mock.call(exp_chunk_size)] * 3,
+                         read_handle.read.call_args_list)
+        self.assertEqual([mock.call(b'data-1'), mock.call(b'data-2')],
+                         write_handle.write.call_args_list)
+        read_handle.close.assert_called_once_with()
+        write_handle.close.assert_called_once_with()
+
+    def test_start_transfer_chunk_size(self):
+        self._test_start_transfer_chunk_size()
+
+    def test_start_transfer_custom_chunk_size(self):
+        self._test_start_transfer_chunk_size(chunk_size=4096)
+
+    def test_start_transfer_short_read(self):
+        read_handle = io.BytesIO(b'abcdefghij')
+        write_handle = mock.Mock()
+        image_transfer._start_transfer(read_handle, write_handle, None,
+                                       chunk_size=4)
+        self.assertEqual([mock.call(b'abcd'), mock.call(b'efgh'),
+                          mock.call(b'ij')],
+                         write_handle.write.call_args_list)
+        write_handle.close.assert_called_once_with()
+
+    def test_start_transfer_empty(self):
+        read_handle = mock.Mock()
+        read_handle.read.return_value = b''
+        write_handle = mock.Mock()
+        image_transfer._start_transfer(read_handle, write_handle, None,
+                                       chunk_size=4)
+        read_handle.read.assert_called_once_with(4)
+        self.assertFalse(write_handle.write.called)
+        read_handle.close.assert_called_once_with()
+        write_handle.close.assert_called_once_with()
+
     @mock.patch('oslo_vmware.rw_handles.FileWriteHandle')
     @mock.patch('oslo_vmware.rw_handles.ImageReadHandle')
     @mock.patch.object(image_transfer, '_start_transfer')
@@ -42,10 +83,9 @@ class ImageTransferUtilityTest(base.TestCase):
             fake_rw_handles_ImageReadHandle,
             fake_rw_handles_FileWriteHandle):
 
-        context = mock.Mock()
-        image_id = mock.Mock()
+        context = mock.sentinel.context
+        image_id = mock.sentinel.image_id
         image_service = mock.Mock()
-        image_service.download = mock.Mock()
         image_service.download.return_value = 'fake_iter'
 
         fake_ImageReadHandle = 'fake_ImageReadHandle'
@@ -92,7 +132,8 @@ class ImageTransferUtilityTest(base.TestCase):
         fake_transfer.assert_called_once_with(
             fake_ImageReadHandle,
             fake_FileWriteHandle,
-            timeout_secs)
+            timeout_secs,
+            chunk_size=None)
 
     @mock.patch('oslo_vmware.rw_handles.FileWriteHandle')
     @mock.patch.object(image_transfer, '_start_transfer')
@@ -118,16 +159,16 @@ class ImageTransferUtilityTest(base.TestCase):
             host, port, dc_name, ds_name, cookies, upload_file_path,
             file_size, cacerts=cacerts)
         start_transfer.assert_called_once_with(
-            read_handle, write_handle, timeout_secs)
+            read_handle, write_handle, timeout_secs, chunk_size=None)
 
     @mock.patch('oslo_vmware.rw_handles.VmdkWriteHandle')
     @mock.patch.object(image_transfer, '_start_transfer')
     def test_download_stream_optimized_data(self, fake_transfer,
                                             fake_rw_handles_VmdkWriteHandle):
 
-        context = mock.Mock()
-        session = mock.Mock()
-        read_handle = mock.Mock()
+        context = mock.sentinel.context
+        session = mock.sentinel.session
+        read_handle = mock.sentinel.read_handle
         timeout_secs = 10
         image_size = 1000
         host = '127.0.0.1'
@@ -137,7 +178,6 @@ class ImageTransferUtilityTest(base.TestCase):
         vm_import_spec = None
 
         fake_VmdkWriteHandle = mock.Mock()
-        fake_VmdkWriteHandle.get_imported_vm = mock.Mock()
         fake_rw_handles_VmdkWriteHandle.return_value = fake_VmdkWriteHandle
 
         image_transfer.download_stream_optimized_data(
@@ -164,7 +204,8 @@ class ImageTransferUtilityTest(base.TestCase):
 
         fake_transfer.assert_called_once_with(read_handle,
                                               fake_VmdkWriteHandle,
-                                              timeout_secs)
+                                              timeout_secs,
+                                              chunk_size=None)
 
         fake_VmdkWriteHandle.get_imported_vm.assert_called_once_with()
 
@@ -221,7 +262,8 @@ class ImageTransferUtilityTest(base.TestCase):
             download_stream_optimized_data,
             image_read_handle,
             container=None,
-            invalid_ova=False):
+            invalid_ova=False,
+            pass_container=False):
 
         image_service = mock.Mock()
         if container:
@@ -251,6 +293,9 @@ class ImageTransferUtilityTest(base.TestCase):
         resource_pool = mock.sentinel.port
         vm_folder = mock.sentinel.vm_folder
         vm_import_spec = mock.sentinel.vm_import_spec
+        extra_kwargs = {}
+        if pass_container:
+            extra_kwargs['container_format'] = container
 
         if container == 'ova' and invalid_ova:
             self.assertRaises(exceptions.ImageTransferException,
@@ -265,7 +310,8 @@ class ImageTransferUtilityTest(base.TestCase):
                               resource_pool=resource_pool,
                               vm_folder=vm_folder,
                               vm_import_spec=vm_import_spec,
-                              image_size=image_size)
+                              image_size=image_size,
+                              **extra_kwargs)
         else:
             ret = image_transfer.download_stream_optimized_image(
                 context,
@@ -278,10 +324,14 @@ class ImageTransferUtilityTest(base.TestCase):
                 resource_pool=resource_pool,
                 vm_folder=vm_folder,
                 vm_import_spec=vm_import_spec,
-                image_size=image_size)
+                image_size=image_size,
+                **extra_kwargs)
 
             self.assertEqual(imported_vm, ret)
-            image_service.show.assert_called_once_with(context, image_id)
+            if pass_container:
+                self.assertFalse(image_service.show.called)
+            else:
+                image_service.show.assert_called_once_with(context, image_id)
             image_service.download.assert_called_once_with(context, image_id)
             image_read_handle.assert_called_once_with(read_iter)
             if container == 'ova':
@@ -311,6 +361,14 @@ class ImageTransferUtilityTest(base.TestCase):
         self._test_download_stream_optimized_image(container='ova',
                                                    invalid_ova=True)
 
+    def test_download_stream_optimized_image_with_container_format(self):
+        self._test_download_stream_optimized_image(container='bare',
+                                                   pass_container=True)
+
+    def test_download_stream_optimized_image_ova_with_container_format(self):
+        self._test_download_stream_optimized_image(container='ova',
+                                                   pass_container=True)
+
     @mock.patch.object(image_transfer, '_start_transfer')
     @mock.patch('oslo_vmware.rw_handles.VmdkReadHandle')
     @mock.patch('oslo_vmware.common.loopingcall.FixedIntervalLoopingCall')
@@ -344,7 +402,7 @@ class ImageTransferUtilityTest(base.TestCase):
         updater.start.assert_called_once_with(
             interval=image_transfer.NFC_LEASE_UPDATE_PERIOD)
         start_transfer.assert_called_once_with(read_handle, write_handle,
-                                               timeout)
+                                               timeout, chunk_size=None)
         updater.stop.assert_called_once_with()
 
     @mock.patch('oslo_vmware.rw_handles.VmdkReadHandle')
@@ -123,9 +123,11 @@ class PBMUtilityTest(base.TestCase):
         pbm_client_factory = mock.Mock()
         pbm_client_factory.create.side_effect = lambda *args: mock.Mock()
         hubs = pbm.convert_datastores_to_hubs(pbm_client_factory, datastores)
-        self.assertEqual(len(datastores), len(hubs))
-        hub_ids = [hub.hubId for hub in hubs]
-        self.assertEqual(set(ds_values), set(hub_ids))
+        self.assertEqual(ds_values, [hub.hubId for hub in hubs])
+        self.assertEqual(['Datastore'] * len(datastores),
+                         [hub.hubType for hub in hubs])
+        pbm_client_factory.create.assert_has_calls(
+            [mock.call('ns0:PbmPlacementHub')] * len(datastores))
 
     def test_filter_datastores_by_hubs(self):
         ds_values = []
@@ -149,6 +151,8 @@ class PBMUtilityTest(base.TestCase):
         self.assertEqual(set(hub_ids), set(filtered_ds_values))
 
     def test_get_pbm_wsdl_location(self):
+        pbm.get_pbm_wsdl_location.cache_clear()
+        self.addCleanup(pbm.get_pbm_wsdl_location.cache_clear)
         wsdl = pbm.get_pbm_wsdl_location(None)
         self.assertIsNone(wsdl)
 
@@ -167,9 +171,18 @@ class PBMUtilityTest(base.TestCase):
             wsdl = pbm.get_pbm_wsdl_location('5.5.1')
             self.assertEqual(expected_wsdl('5.5'), wsdl)
             path_exists.return_value = False
+            pbm.get_pbm_wsdl_location.cache_clear()
             wsdl = pbm.get_pbm_wsdl_location('5.5')
             self.assertIsNone(wsdl)
 
+    @mock.patch('os.path.exists', return_value=True)
+    def test_get_pbm_wsdl_location_cached(self, path_exists):
+        pbm.get_pbm_wsdl_location.cache_clear()
+        self.addCleanup(pbm.get_pbm_wsdl_location.cache_clear)
+        wsdl = pbm.get_pbm_wsdl_location('6.5')
+        self.assertEqual(wsdl, pbm.get_pbm_wsdl_location('6.5'))
+        path_exists.assert_called_once_with(mock.ANY)
+
     def test_get_profiles(self):
         pbm_service = mock.Mock()
         session = mock.Mock(pbm=pbm_service)
@@ -274,6 +274,16 @@ class VmdkWriteHandleTest(base.TestCase):
         handle.write([1] * data_size)
         handle.update_progress()
 
+    def test_get_progress(self):
+        session = self._create_mock_session()
+        handle = rw_handles.VmdkWriteHandle(session, '10.1.2.3', 443,
+                                            'rp-1', 'folder-1', None,
+                                            3)
+        handle.write([1])
+        self.assertEqual(33, handle._get_progress())
+        handle.write([1] * 2)
+        self.assertEqual(100, handle._get_progress())
+
     def test_close(self):
         session = self._create_mock_session()
         handle = rw_handles.VmdkWriteHandle(session, '10.1.2.3', 443,
@@ -456,3 +466,9 @@ class ImageReadHandleTest(base.TestCase):
         for _ in range(0, max_items):
             self.assertEqual(item, handle.read(10))
         self.assertFalse(handle.read(10))
+
+    def test_read_and_get_next(self):
+        handle = rw_handles.ImageReadHandle(iter([b'1', b'2', b'3']))
+        self.assertEqual(b'1', handle.read(10))
+        self.assertEqual([b'2', b'3'], list(handle.get_next()))
+        self.assertFalse(handle.read(10))
@@ -35,8 +35,12 @@ class ServiceMessagePluginTest(base.TestCase):
         super(ServiceMessagePluginTest, self).setUp()
         self.plugin = service.ServiceMessagePlugin()
 
-    @ddt.data(('value', 'foo', 'string'), ('removeKey', '1', 'int'),
-              ('removeKey', 'foo', 'string'))
+    @ddt.data(('value', 'foo', 'string'), ('val', 'foo', 'string'),
+              ('removeKey', '1', 'int'), ('removeKey', '-1', 'int'),
+              ('removeKey', '+1', 'int'), ('removeKey', ' 1 ', 'int'),
+              ('removeKey', '--1', 'string'), ('removeKey', '-', 'string'),
+              ('removeKey', '\u00b2', 'string'),
+              ('removeKey', 'foo', 'string'), ('removeKey', None, 'string'))
     @ddt.unpack
     def test_add_attribute_for_value(self, name, text, expected_xsd_type):
         node = mock.Mock()
@@ -46,13 +50,37 @@ class ServiceMessagePluginTest(base.TestCase):
         node.set.assert_called_once_with('xsi:type',
                                          'xsd:%s' % expected_xsd_type)
 
+    def test_add_attribute_for_value_with_other_node(self):
+        node = mock.Mock()
+        node.name = 'key'
+        node.text = 'foo'
+        self.plugin.add_attribute_for_value(node)
+        self.assertFalse(node.set.called)
+
     def test_marshalled(self):
         context = mock.Mock()
         self.plugin.prune = mock.Mock()
+        self.plugin.add_attribute_for_value = mock.Mock()
         self.plugin.marshalled(context)
         self.plugin.prune.assert_called_once_with(context.envelope)
-        context.envelope.walk.assert_called_once_with(
-            self.plugin.add_attribute_for_value)
+        self.plugin.add_attribute_for_value.assert_called_once_with(
+            context.envelope)
+
+    def test_prune(self):
+        root = suds.sax.element.Element('root')
+        spec = suds.sax.element.Element('spec')
+        value = suds.sax.element.Element('value').setText('foo')
+        spec.append([suds.sax.element.Element('value'), value])
+        empty_profile = suds.sax.element.Element(
+            'VirtualMachineEmptyProfileSpec')
+        root.append([suds.sax.element.Element('empty'), spec,
+                     suds.sax.element.Element('removeKey'), empty_profile])
+
+        self.plugin.prune(root)
+
+        self.assertEqual([spec, empty_profile], root.children)
+        self.assertEqual([value], spec.children)
+        self.assertIn('xsi:type="xsd:string"', str(value))
 
 
 @ddt.ddt
@@ -90,6 +118,32 @@ class ServiceTest(base.TestCase):
             response)
         self.assertEqual(fault_list, ex.fault_list)
 
+    def test_retrieve_properties_ex_fault_checker_with_no_missing_set(self):
+        response = mock.Mock()
+        response.objects = [mock.Mock(spec=['obj', 'propSet'])]
+        self.assertIsNone(
+            service.Service._retrieve_properties_ex_fault_checker(response))
+
+    def test_retrieve_properties_ex_fault_checker_with_partial_missing_set(
+            self):
+        missing_elem = mock.Mock()
+        f_type = missing_elem.fault.fault
+        f_type.__class__.__name__ = exceptions.NO_PERMISSION
+        f_type.object = vim_util.get_moref('vm-1', 'VirtualMachine')
+        f_type.privilegeId = 'System.Read'
+        obj_cont = mock.Mock(spec=['obj', 'propSet', 'missingSet'])
+        obj_cont.missingSet = [missing_elem]
+        response = mock.Mock()
+        response.objects = [mock.Mock(spec=['obj', 'propSet']), obj_cont]
+
+        ex = self.assertRaises(
+            exceptions.VimFaultException,
+            service.Service._retrieve_properties_ex_fault_checker,
+            response)
+        self.assertEqual([exceptions.NO_PERMISSION], ex.fault_list)
+        self.assertEqual({'object': 'vm-1', 'privilegeId': 'System.Read'},
+                         ex.details)
+
     def test_request_handler(self):
         managed_object = 'VirtualMachine'
         resp = mock.Mock()
@@ -106,6 +160,36 @@ class ServiceTest(base.TestCase):
         ret = svc_obj.powerOn(managed_object)
         self.assertEqual(resp, ret)
 
+    def test_request_handler_with_new_client(self):
+        managed_object = 'VirtualMachine'
+        svc_obj = service.Service()
+        old_client = svc_obj.client
+        svc_obj.powerOn(managed_object)
+
+        new_client = mock.Mock()
+        svc_obj.client = new_client
+        svc_obj.powerOn(managed_object)
+        self.assertEqual(1, old_client.service.powerOn.call_count)
+        self.assertEqual(1, new_client.service.powerOn.call_count)
+
+    @mock.patch.object(service.Service, '_set_soap_headers')
+    def test_request_handler_op_id(self, set_soap_headers):
+        svc_obj = service.Service(op_id_prefix='fira')
+        svc_obj.powerOn('VirtualMachine')
+        svc_obj.powerOn('VirtualMachine')
+
+        op_ids = [args[0] for args, _kwargs in
+                  set_soap_headers.call_args_list]
+        self.assertEqual(2, len(set(op_ids)))
+        for op_id in op_ids:
+            self.assertTrue(op_id.startswith('fira-'))
+
+    @mock.patch.object(service.Service, '_set_soap_headers')
+    def test_request_handler_skip_op_id(self, set_soap_headers):
+        svc_obj = service.Service()
+        svc_obj.powerOn('VirtualMachine', skip_op_id=True)
+        set_soap_headers.assert_called_once_with(None)
+
     def test_request_handler_with_retrieve_properties_ex_fault(self):
         managed_object = 'Datacenter'
 
@@ -380,6 +464,14 @@ class ServiceTest(base.TestCase):
         svc_obj.client.cookiejar = [cookie]
         self.assertEqual(cookie_value, svc_obj.get_http_cookie())
 
+    def test_get_session_cookie_with_mixed_case_name(self):
+        svc_obj = service.Service()
+        cookie = mock.Mock()
+        cookie.name = 'VMware_soap_session'
+        cookie.value = 'xyz'
+        svc_obj.client.cookiejar = [mock.Mock(), cookie]
+        self.assertEqual('xyz', svc_obj.get_http_cookie())
+
     def test_get_session_cookie_with_no_cookie(self):
         svc_obj = service.Service()
         cookie = mock.Mock()
@@ -400,6 +492,52 @@ class ServiceTest(base.TestCase):
         setattr(svc_obj.client, 'set_options', fake_set_options)
         svc_obj._set_soap_headers('fira-12345')
 
+    def test_set_soap_headers_reuses_elements(self):
+        svc_obj = service.Service()
+        svc_obj._vc_session_cookie = 'vc-session-cookie'
+        svc_obj.client.set_options = mock.Mock()
+        svc_obj._set_soap_headers('fira-1')
+        headers1 = svc_obj.client.set_options.call_args[1]['soapheaders']
+        svc_obj._set_soap_headers('fira-2')
+        headers2 = svc_obj.client.set_options.call_args[1]['soapheaders']
+
+        self.assertIs(headers1[0], headers2[0])
+        self.assertIs(headers1[1], headers2[1])
+        self.assertEqual('fira-2', headers2[1].getText())
+
+        svc_obj._vc_session_cookie = 'vc-session-cookie-2'
+        svc_obj._set_soap_headers('fira-3')
+        headers3 = svc_obj.client.set_options.call_args[1]['soapheaders']
+        self.assertEqual('vc-session-cookie-2', headers3[0].getText())
+
+    def test_set_soap_headers_without_op_id(self):
+        svc_obj = service.Service()
+        svc_obj.client.set_options = mock.Mock()
+        svc_obj._set_soap_headers('fira-12345')
+        svc_obj._set_soap_headers(None)
+        svc_obj._set_soap_headers(None)
+        self.assertEqual(2, svc_obj.client.set_options.call_count)
+        self.assertEqual(
+            [], svc_obj.client.set_options.call_args[1]['soapheaders'])
+
+        svc_obj._vc_session_cookie = 'vc-session-cookie'
+        svc_obj._set_soap_headers(None)
+        self.assertEqual(3, svc_obj.client.set_options.call_count)
+        headers = svc_obj.client.set_options.call_args[1]['soapheaders']
+        self.assertEqual(1, len(headers))
+        self.assertEqual('vc-session-cookie', headers[0].getText())
+
+    def test_set_soap_headers_with_new_client(self):
+        svc_obj = service.Service()
+        svc_obj._vc_session_cookie = 'vc-session-cookie'
+        svc_obj._set_soap_headers(None)
+
+        svc_obj.client = mock.Mock()
+        svc_obj._set_soap_headers(None)
+        headers = svc_obj.client.set_options.call_args[1]['soapheaders']
+        self.assertEqual(1, len(headers))
+        self.assertEqual('vc-session-cookie', headers[0].getText())
+
     def test_soap_headers_pbm(self):
         def fake_set_options(*args, **kwargs):
             headers = kwargs['soapheaders']
@@ -433,7 +571,9 @@ class MemoryCacheTest(base.TestCase):
 
     @mock.patch('oslo_utils.timeutils.utcnow_ts')
     def test_cache_timeout(self, mock_utcnow_ts):
-        mock_utcnow_ts.side_effect = [100, 125, 150, 175, 195, 200, 225]
+        # key1 expires at 110 and is purged by the put at 125, hence its
+        # lookup does not read the clock.
+        mock_utcnow_ts.side_effect = [100, 125, 150, 175, 200, 225]
 
         cache = service.MemoryCache()
         cache.put('key1', 'value1', 10)
@@ -445,6 +585,26 @@ class MemoryCacheTest(base.TestCase):
         self.assertIsNone(cache.get('key2'))
         self.assertEqual('value3', cache.get('key3'))
 
+    @mock.patch('oslo_utils.timeutils.utcnow_ts')
+    def test_put_purges_expired_entries(self, mock_utcnow_ts):
+        mock_utcnow_ts.side_effect = [100, 200]
+
+        cache = service.MemoryCache()
+        cache.put('key1', 'value1', 10)
+        cache.put('key2', 'value2', 10)
+
+        self.assertEqual(['key2'], list(cache._cache))
+
+
+class ResponseTest(base.TestCase):
+    """Tests for Response."""
+
+    def test_read(self):
+        resp = service.Response(b"Hello World")
+        self.assertEqual(b"Hello", resp.read(5))
+        self.assertEqual(b" World", resp.read(None))
+        self.assertEqual(b"", resp.read())
+
 
 class RequestsTransportTest(base.TestCase):
     """Tests for RequestsTransport."""
@@ -479,6 +639,22 @@ class RequestsTransportTest(base.TestCase):
         self.assertEqual(mock.sentinel.headers, reply.headers)
         self.assertEqual(mock.sentinel.content, reply.message)
 
+    def test_send_compression_and_keepalive(self):
+        transport = service.RequestsTransport()
+        resp = mock.Mock(status_code=200, headers={}, content=b'')
+        transport.session.send = mock.Mock(return_value=resp)
+
+        request = mock.Mock(url='https://vc/sdk', message=b'<soap/>',
+                            headers={'SOAPAction': '"urn:vim25/6.5"'})
+        transport.send(request)
+
+        prepared_request = transport.session.send.call_args[0][0]
+        self.assertEqual('POST', prepared_request.method)
+        self.assertEqual('"urn:vim25/6.5"',
+                         prepared_request.headers['SOAPAction'])
+        self.assertIn('gzip', prepared_request.headers['Accept-Encoding'])
+        self.assertEqual('keep-alive', prepared_request.headers['Connection'])
+
     def test_set_conn_pool_size(self):
         transport = service.RequestsTransport(pool_maxsize=100)
         local_file_adapter = transport.session.adapters['file:///']
@@ -488,6 +664,20 @@ class RequestsTransportTest(base.TestCase):
         self.assertEqual(100, https_adapter._pool_connections)
         self.assertEqual(100, https_adapter._pool_maxsize)
 
+    def test_http_adapter(self):
+        transport = service.RequestsTransport(pool_maxsize=100)
+        http_adapter = transport.session.adapters['http://']
+        self.assertIs(transport.session.adapters['https://'], http_adapter)
+        self.assertEqual(100, http_adapter._pool_connections)
+        self.assertEqual(100, http_adapter._pool_maxsize)
+
+    def test_set_pool_connections(self):
+        transport = service.RequestsTransport(pool_maxsize=100,
+                                              pool_connections=2)
+        https_adapter = transport.session.adapters['https://']
+        self.assertEqual(2, https_adapter._pool_connections)
+        self.assertEqual(100, https_adapter._pool_maxsize)
+
     @mock.patch('os.path.getsize')
     def test_send_with_local_file_url(self, get_size_mock):
         transport = service.RequestsTransport()
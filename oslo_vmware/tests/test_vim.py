@@ -61,6 +61,11 @@ class VimTest(base.TestCase):
         self.assertEqual('https://[::1]/sdk',
                          vim_obj.soap_url)
 
+    def test_configure_bracketed_ipv6(self):
+        vim_obj = vim.Vim('https', '[::1]')
+        self.assertEqual('https://[::1]/sdk',
+                         vim_obj.soap_url)
+
     def test_configure_ipv6_and_non_default_host_port(self):
         vim_obj = vim.Vim('https', '::1', 12345)
         self.assertEqual('https://[::1]:12345/sdk/vimService.wsdl',
@@ -21,7 +21,8 @@ class Vim(service.Service):
 
     def __init__(self, protocol='https', host='localhost', port=None,
                  wsdl_url=None, cacert=None, insecure=True, pool_maxsize=10,
-                 connection_timeout=None, op_id_prefix='oslo.vmware'):
+                 connection_timeout=None, op_id_prefix='oslo.vmware',
+                 pool_connections=None):
         """Constructs a VIM service client object.
 
         :param protocol: http or https
@@ -37,6 +38,8 @@ class Vim(service.Service):
         :param connection_timeout: Maximum time in seconds to wait for peer to
                                    respond.
         :param op_id_prefix: String prefix for the operation ID.
+        :param pool_connections: Number of per-host connection pools to
+                                 cache; defaults to pool_maxsize
         :raises: VimException, VimFaultException, VimAttributeException,
                  VimSessionOverLoadException, VimConnectionException
         """
@@ -46,7 +49,8 @@ class Vim(service.Service):
             wsdl_url = soap_url + '/vimService.wsdl'
         super(Vim, self).__init__(wsdl_url, soap_url, cacert, insecure,
                                   pool_maxsize, connection_timeout,
-                                  op_id_prefix)
+                                  op_id_prefix,
+                                  pool_connections=pool_connections)
 
     def retrieve_service_content(self):
         return self.RetrieveServiceContent(service.SERVICE_INSTANCE)